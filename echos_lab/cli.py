@@ -71,7 +71,14 @@ def clear_cookies():
 @cli.command("create-telegram-group")
 def create_telegram_group():
     """Create a telegram group for testing"""
-    asyncio.run(telegram_groups.create_test_group())
+
+    async def create_group():
+        try:
+            await telegram_groups.create_test_group()
+        finally:
+            await telegram_groups.disconnect_telethon_client()
+
+    asyncio.run(create_group())
 
 
 @cli.command("balances")
@@ -2,7 +2,7 @@ from datetime import UTC, datetime
 from typing import Sequence
 
 import tweepy
-from sqlalchemy import desc
+from sqlalchemy import Row, desc, select
 from sqlalchemy.orm import Session
 
 from echos_lab.db.models import (
@@ -39,6 +39,20 @@ def add_telegram_message(db: Session, username: str, message: str, chat_id: int)
     return new_message
 
 
+def add_telegram_messages(db: Session, messages: Sequence[tuple[str, str, int]]) -> None:
+    """
+    Add a batch of Telegram messages to the database in a single commit.
+
+    Args:
+        db: Database session
+        messages: Sequence of (username, message content, chat ID) tuples
+    """
+    db.add_all(
+        TelegramMessage(user_id=username, content=message, chat_id=chat_id) for username, message, chat_id in messages
+    )
+    db.commit()
+
+
 def get_telegram_messages(db: Session, chat_id: int, history: int = 100) -> Sequence[TelegramMessage]:
     """Get recent messages from a Telegram chat.
 
@@ -59,6 +73,58 @@ def get_telegram_messages(db: Session, chat_id: int, history: int = 100) -> Sequ
     )
 
 
+def get_telegram_message_history(db: Session, chat_id: int, history: int = 100) -> Sequence[Row[tuple[str, str]]]:
+    """Get the sender and content of recent messages from a Telegram chat.
+
+    Unlike get_telegram_messages, this only loads the two columns needed to summarize the chat
+
+    Args:
+        db: Database session
+        chat_id: Telegram chat ID to fetch from
+        history: Number of recent messages to return
+
+    Returns:
+        Sequence of (user_id, content) rows, most recent first
+    """
+    query = (
+        select(TelegramMessage.user_id, TelegramMessage.content)
+        .where(TelegramMessage.chat_id == chat_id)
+        .order_by(TelegramMessage.id.desc())
+        .limit(history)
+    )
+    return db.execute(query).all()
+
+
+def get_telegram_message_contents_containing(
+    db: Session,
+    chat_id: int,
+    username: str,
+    substring: str,
+    history: int = 100,
+) -> Sequence[str]:
+    """Get the contents of a user's recent messages in a Telegram chat that contain a substring.
+
+    Args:
+        db: Database session
+        chat_id: Telegram chat ID to fetch from
+        username: The user ID of the sender to filter to
+        substring: Text that each message must contain
+        history: Max number of messages to return
+
+    Returns:
+        Sequence of message contents, most recent first
+    """
+    query = (
+        select(TelegramMessage.content)
+        .where(TelegramMessage.chat_id == chat_id)
+        .where(TelegramMessage.user_id == username)
+        .where(TelegramMessage.content.contains(substring, autoescape=True))
+        .order_by(TelegramMessage.id.desc())
+        .limit(history)
+    )
+    return db.scalars(query).all()
+
+
 def add_tweet(
     db: Session,
     tweet_id: int,
@@ -6,9 +6,8 @@ env_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("en
 
 def set_env_var(key, value):
     # get the current context or start with an empty dict if none exists
-    env_vars = env_context.get({})
-    # update the specific variable
-    env_vars[key] = value
+    # copy it rather than updating in place, so that concurrent tasks don't overwrite each other's variables
+    env_vars = {**env_context.get({}), key: value}
     # set the updated env_vars back to env_context
     env_context.set(env_vars)
 
@@ -1,3 +1,4 @@
+import asyncio
 import inspect
 import os
 
@@ -80,11 +81,13 @@ def get_agent_executor() -> AgentExecutor:
     return _agent_executor
 
 
-def get_crypto_balance_message() -> SystemMessage:
+async def get_crypto_balance_message() -> SystemMessage:
     """
     Supplemental system prompt to always provide the bot with their updated balances
+    The balance query is blocking, so it's run in the default executor to keep the event loop free
     """
-    crypto_balance = crypto_connector.query_self_account_balance()
+    loop = asyncio.get_running_loop()
+    crypto_balance = await loop.run_in_executor(None, crypto_connector.query_self_account_balance)
     balance_str = crypto_connector.format_balances(crypto_balance)
     balance_text = (
         f"Your crypto balances are: {balance_str}\n\nALWAYS use this to get your balance, not Twitter or Telegram."
@@ -120,7 +123,8 @@ async def respond_in_telegram_individual_flow(username: str, new_message_content
     """
     context_store.set_env_var("telegram_chat_id", individual_chat_id)
     agent_executor = get_agent_executor()
-    messages = await agent_executor.ainvoke({"input": query, "chat_history": [get_crypto_balance_message()]})
+    balance_message = await get_crypto_balance_message()
+    messages = await agent_executor.ainvoke({"input": query, "chat_history": [balance_message]})
     return messages
 
 
@@ -153,7 +157,8 @@ async def respond_in_telegram_groupchat_flow(username: str, new_message_contents
     """
     context_store.set_env_var("telegram_chat_id", group_chat_id)
     agent_executor = get_agent_executor()
-    messages = await agent_executor.ainvoke({"input": query, "chat_history": [get_crypto_balance_message()]})
+    balance_message = await get_crypto_balance_message()
+    messages = await agent_executor.ainvoke({"input": query, "chat_history": [balance_message]})
     return messages
 
 
@@ -191,5 +196,6 @@ async def twitter_flow(twitter_handle: str, individual_chat_id: int):
     """
     context_store.set_env_var("telegram_chat_id", individual_chat_id)
     agent_executor = get_agent_executor()
-    messages = await agent_executor.ainvoke({"input": query, "chat_history": [get_crypto_balance_message()]})
+    balance_message = await get_crypto_balance_message()
+    messages = await agent_executor.ainvoke({"input": query, "chat_history": [balance_message]})
     return messages
@@ -1,4 +1,4 @@
-import time
+import asyncio
 import traceback
 from typing import List
 
@@ -49,7 +49,9 @@ async def construct_viral_tweet(subject_matter: str, sentiment: str, replying_to
     - str: The generated tweet content.
     """
     agent_profile = profiles.get_legacy_agent_profile()
-    new_tweet = post_maker.generate_tweet_from_model(agent_profile.model_name, sentiment, subject_matter, replying_to)
+    new_tweet = await post_maker.generate_tweet_from_model(
+        agent_profile.model_name, sentiment, subject_matter, replying_to
+    )
     return new_tweet
 
 
@@ -264,7 +266,7 @@ async def get_twitter_post(post_id: str) -> str:
         except Exception:
             traceback.print_exc()
             print(f"Trying again to fetch tweet {post_id}")
-            time.sleep(3)
+            await asyncio.sleep(3)
     return "Error fetching tweet."
 
 
@@ -338,16 +340,17 @@ def get_telegram_messages_raw(chat_id: int, specific_user: str | None = None) ->
 
     Optionally filter to just messages for a given user
     """
-    messages = telegram_client.get_telegram_messages(target_chat_id=chat_id)[::-1]
-
-    # Optionally filter for just messages from the specific user
-    if specific_user:
-        messages = [msg for msg in messages if msg.user_id == specific_user]
+    messages = telegram_client.get_telegram_message_history(target_chat_id=chat_id)
 
-    # Format each message as:
+    # Format each message as (oldest first, optionally filtering for just messages from the specific user):
     #   Here's my message
     #   From: Username
-    formatted_messages = [f"\t{msg.content}\n\tFrom: {msg.user_id}" for msg in messages]
+    # The history is most recent first, so it's iterated in reverse rather than copied into a reversed list
+    formatted_messages = [
+        f"\t{msg.content}\n\tFrom: {msg.user_id}"
+        for msg in reversed(messages)
+        if not specific_user or msg.user_id == specific_user
+    ]
 
     # Build full summary string
     return "\n".join(
@@ -448,7 +451,9 @@ async def construct_specialized_llm_tweet(
         specific_user="You", chat_id=context_store.get_env_var("telegram_chat_id")
     )
     recent_messages = recent_messages.replace("TELEGRAM MESSAGES\n====================\n", "")
-    new_tweet = post_maker.generate_tweet_from_model_hal(mode, recent_messages, timeline, respond_to=respond_to)
+    new_tweet = await post_maker.generate_tweet_from_model_hal(
+        mode, recent_messages, timeline, respond_to=respond_to
+    )
     return new_tweet
 
 
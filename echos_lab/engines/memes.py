@@ -15,6 +15,20 @@ GET_MEME_URL = f"{IMGFLIP_API_ENDPOINT}/get_meme"
 CAPTION_IMAGE_URL = f"{IMGFLIP_API_ENDPOINT}/caption_image"
 AUTO_MEME_URL = f"{IMGFLIP_API_ENDPOINT}/automeme"
 
+# Module singleton storage for the imgflip http session
+_session: requests.Session | None = None
+
+
+def get_imgflip_session() -> requests.Session:
+    """
+    Singleton to get or create the http session used for imgflip requests
+    Reusing the session keeps the connection to imgflip alive across memes
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
 
 def imgflip_request(url: str, payload: dict, remove_watermark: bool = False) -> dict:
     """
@@ -30,7 +44,7 @@ def imgflip_request(url: str, payload: dict, remove_watermark: bool = False) ->
         "no_watermark": 1 if remove_watermark else None,
     }
     payload = {**payload, **auth}
-    response = requests.post(url, data=payload)
+    response = get_imgflip_session().post(url, data=payload, timeout=30)
     response.raise_for_status()
 
     response_json = response.json()
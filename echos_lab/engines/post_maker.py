@@ -1,11 +1,15 @@
 import json
+import math
 import os
-from functools import lru_cache
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
 
 import tweepy
 from fuzzywuzzy import fuzz
 from langchain_anthropic import ChatAnthropic
-from openpipe import OpenAI
+from langchain_core.output_parsers import StrOutputParser
+from openpipe import AsyncOpenAI
 
 from echos_lab.common.env import EnvironmentVariables as envs
 from echos_lab.common.env import get_env_or_raise
@@ -13,21 +17,47 @@ from echos_lab.crypto import crypto_connector
 from echos_lab.db import models
 from echos_lab.engines import agent_context, legacy, prompts
 from echos_lab.engines.profiles import AgentProfile, LegacyAgentProfile
-from echos_lab.engines.prompts import (
-    SubTweetEvaluation,
-    TweetEvaluation,
-    XMLAttributeParser,
-)
+from echos_lab.engines.prompts import SubTweetEvaluation, TweetEvaluation
 
 base_path = os.path.dirname(os.path.abspath(__file__))
 TWEET_DATA_PATH = f"{base_path}/tweet_data"
 if not os.path.exists(TWEET_DATA_PATH):
     os.makedirs(TWEET_DATA_PATH)
 
+# Placeholders in the HAL tweet prompt, substituted in a single pass
+HAL_PROMPT_PLACEHOLDERS = re.compile(
+    "INSERT_MODE|RECENT_TWEETS_HERE|INSERT_TIMELINE_HERE|INSERT_RESPONSE_TWEET_HERE|INSERT_ADDRESS_HERE"
+)
+
+# Patterns used to normalize tweets before checking for similarity
+URL_REGEX = re.compile(r"https?://\S+")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+# Character length of the shingles used to prefilter similar tweets
+# This has to stay small for the prefilter to rule anything out: with a similarity threshold
+# of 85, a near-duplicate is only guaranteed to share shingles if they're shorter than 4 characters
+SHINGLE_SIZE = 3
+
+
+@dataclass
+class TweetDataFile:
+    # Modification time of the file when it was parsed
+    mtime: int
+    # Raw text of each tweet in the file
+    tweets: list[str]
+    # Normalized text of each tweet, used for similarity checks
+    normalized_tweets: list[str]
+    # Index from each shingle to the (index, occurrence count) of the normalized tweets that contain it
+    shingle_index: dict[str, list[tuple[int, int]]]
+
 
 # Module level executor singleton storage
 _reply_guy_llm: ChatAnthropic | None = None
-_open_ai_client: OpenAI | None = None
+_hal_llms: dict[str, ChatAnthropic] = {}
+_open_ai_client: AsyncOpenAI | None = None
+
+# Parsed tweet data files, keyed by file path
+_tweet_data_cache: dict[str, TweetDataFile] = {}
 
 
 def get_reply_guy_llm(model_name: str) -> ChatAnthropic:
@@ -47,36 +77,135 @@ def get_reply_guy_llm(model_name: str) -> ChatAnthropic:
     return _reply_guy_llm
 
 
-def get_open_api_client() -> OpenAI:
+def get_hal_llm(model_name: str) -> ChatAnthropic:
+    """
+    Gets or creates the Claude LLM client used for the legacy HAL tweets
+    Clients are cached per model name
+    """
+    if model_name not in _hal_llms:
+        _hal_llms[model_name] = ChatAnthropic(
+            model_name=model_name,
+            temperature=0.9,
+            timeout=None,
+            max_retries=2,
+            stop=None,
+            verbose=True,
+        )
+    return _hal_llms[model_name]
+
+
+def get_open_api_client() -> AsyncOpenAI:
     """
     Singleton to get or create a new OpenAI client
     """
     global _open_ai_client
     if _open_ai_client is None:
         openpipe_api_key = get_env_or_raise(envs.OPENPIPE_API_KEY)
-        _open_ai_client = OpenAI(openpipe={"api_key": openpipe_api_key})
+        _open_ai_client = AsyncOpenAI(openpipe={"api_key": openpipe_api_key})
     return _open_ai_client
 
 
-@lru_cache
+def normalize_tweet_text(text: str) -> str:
+    """
+    Normalizes tweet text for near-duplicate detection by lowercasing,
+    stripping links, and collapsing whitespace
+    """
+    return WHITESPACE_REGEX.sub(" ", URL_REGEX.sub("", text.lower())).strip()
+
+
+def get_shingle_counts(text: str) -> Counter[str]:
+    """
+    Returns the number of occurrences of each overlapping character n-gram (of length SHINGLE_SIZE) in the text
+    """
+    return Counter(text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def get_min_shared_shingles(total_length: int, threshold: float) -> int:
+    """
+    Returns a lower bound on the number of shingle occurrences that two texts with the given
+    combined length must share for their fuzz.ratio to be above the threshold
+
+    fuzz.ratio is at most 200 * LCS / total_length (where LCS is the length of the longest common
+    subsequence), so a match needs an LCS of at least `min_lcs`. Each of the (total_length - 2 * min_lcs)
+    characters outside of the LCS can break at most (SHINGLE_SIZE - 1) of the LCS's shingles,
+    and every unbroken shingle appears in both texts
+    If the bound is zero or negative, shingles can't rule out a match
+    """
+    min_lcs = math.floor(threshold * total_length / 200) + 1
+    unmatched_chars = total_length - 2 * min_lcs
+    return (min_lcs - SHINGLE_SIZE + 1) - (SHINGLE_SIZE - 1) * unmatched_chars
+
+
+def _load_tweet_data_file(path: str, mtime: int) -> TweetDataFile:
+    """
+    Loads the tweet text from each line of a single .jsonl file
+    """
+    tweets = []
+    with open(path, "r") as f:
+        for line in f:
+            data = json.loads(line)
+            if "text" in data:
+                tweets.append(data["text"])
+    normalized_tweets = [normalize_tweet_text(tweet) for tweet in tweets]
+
+    # Index the tweets by shingle so that similarity checks only need to score
+    # the tweets that share enough text with the candidate
+    shingle_index: dict[str, list[tuple[int, int]]] = defaultdict(list)
+    for index, tweet in enumerate(normalized_tweets):
+        for shingle, count in get_shingle_counts(tweet).items():
+            shingle_index[shingle].append((index, count))
+
+    return TweetDataFile(
+        mtime=mtime,
+        tweets=tweets,
+        normalized_tweets=normalized_tweets,
+        shingle_index=dict(shingle_index),
+    )
+
+
+def _load_tweet_data_files() -> list[TweetDataFile]:
+    """
+    Loads all of the .jsonl files in "tweet_data" directory.
+
+    Parsed files are cached by their modification time, so only files that were
+    added or changed since the last call are re-read
+    """
+    data_files = []
+    current_paths = set()
+    with os.scandir(TWEET_DATA_PATH) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".jsonl"):
+                continue
+
+            current_paths.add(entry.path)
+            mtime = entry.stat().st_mtime_ns
+            data_file = _tweet_data_cache.get(entry.path)
+            if data_file is None or data_file.mtime != mtime:
+                data_file = _load_tweet_data_file(entry.path, mtime)
+                _tweet_data_cache[entry.path] = data_file
+
+            data_files.append(data_file)
+
+    # Drop any files that have since been removed
+    for path in _tweet_data_cache.keys() - current_paths:
+        del _tweet_data_cache[path]
+
+    return data_files
+
+
 def load_tweet_data() -> list[str]:
     """
     Loads tweet data from all of the .jsonl files in "tweet_data" directory.
     """
-    tweets = []
-    for file in os.listdir(TWEET_DATA_PATH):
-        if file.endswith(".jsonl"):
-            with open(f"{TWEET_DATA_PATH}/{file}", "r") as f:
-                for line in f:
-                    data = json.loads(line)
-                    if "text" in data:
-                        tweets.append(data["text"])
-    return tweets
+    return [tweet for data_file in _load_tweet_data_files() for tweet in data_file.tweets]
 
 
 def verify_tweet_dissimilar_from_tweet_data(tweet_contents: str, threshold=85) -> bool:
     """
     Calculates similarity score between the generated tweet and all tweets in the tweet data.
+    Tweets are normalized before comparing so that casing, links, and whitespace are ignored,
+    and tweets are only scored if their length and number of shared shingles leave room for a match
+    (both bounds are exact, so no tweet that could be above the threshold is skipped)
 
     If the similarity score is above a certain threshold, the tweet is considered similar.
 
@@ -86,15 +215,40 @@ def verify_tweet_dissimilar_from_tweet_data(tweet_contents: str, threshold=85) -
     Returns:
         bool: True if the tweet is dissimilar, False if the tweet is similar
     """
-    tweets = load_tweet_data()
-    for tweet in tweets:
-        similarity = fuzz.ratio(tweet, tweet_contents)
-        if similarity > threshold:
-            return False
+    normalized_contents = normalize_tweet_text(tweet_contents)
+    shingle_counts = get_shingle_counts(normalized_contents)
+    contents_length = len(normalized_contents)
+
+    for data_file in _load_tweet_data_files():
+        # Count the shingle occurrences that each tweet shares with the generated tweet
+        shared_shingles: dict[int, int] = defaultdict(int)
+        for shingle, count in shingle_counts.items():
+            for index, tweet_count in data_file.shingle_index.get(shingle, []):
+                shared_shingles[index] += min(count, tweet_count)
+
+        for index, tweet in enumerate(data_file.normalized_tweets):
+            # Identical tweets are always similar (this also covers two empty tweets, which the bounds below skip)
+            if tweet == normalized_contents:
+                return False
+
+            # The ratio can be at most 200 * shorter / (sum of lengths), so skip the
+            # full comparison when the lengths alone rule out a match
+            tweet_length = len(tweet)
+            total_length = tweet_length + contents_length
+            if 200 * min(tweet_length, contents_length) <= threshold * total_length:
+                continue
+
+            # Skip the full comparison if the tweets don't share enough shingles to be a match
+            if shared_shingles.get(index, 0) < get_min_shared_shingles(total_length, threshold):
+                continue
+
+            similarity = fuzz.ratio(tweet, normalized_contents)
+            if similarity > threshold:
+                return False
     return True
 
 
-def generate_tweet_from_model(model_name: str, sentiment: str, subject_matter: str, replying_to: str) -> str:
+async def generate_tweet_from_model(model_name: str, sentiment: str, subject_matter: str, replying_to: str) -> str:
     """
     Generate a new post or reply based on a few words of a prompt.
 
@@ -117,7 +271,7 @@ def generate_tweet_from_model(model_name: str, sentiment: str, subject_matter: s
         )
     print(prompt, model_name)
 
-    completion = client.chat.completions.create(  # type: ignore
+    completion = await client.chat.completions.create(  # type: ignore
         model=f"{model_name}",
         messages=[
             {
@@ -153,7 +307,7 @@ def generate_tweet_from_model(model_name: str, sentiment: str, subject_matter: s
         return "Generated tweet was invalid. Please try again."
 
 
-def generate_tweet_from_model_hal(
+async def generate_tweet_from_model_hal(
     mode: str,
     recent_tweets: str,
     timeline: str,
@@ -161,25 +315,21 @@ def generate_tweet_from_model_hal(
 ):
     agent_profile = LegacyAgentProfile.from_yaml("hal")
 
-    llm = ChatAnthropic(
-        model_name=agent_profile.model_name,
-        temperature=0.9,
-        timeout=None,
-        max_retries=2,
-        stop=None,
-        verbose=True,
-    )
-    prompt = legacy.get_hal_tweet_prompt()
-    prompt = prompt.replace("INSERT_MODE", mode)
-    prompt = prompt.replace("RECENT_TWEETS_HERE", recent_tweets)
-    prompt = prompt.replace("INSERT_TIMELINE_HERE", timeline)
-    prompt = prompt.replace("INSERT_RESPONSE_TWEET_HERE", respond_to)
-    prompt = prompt.replace("INSERT_ADDRESS_HERE", crypto_connector.get_address())
+    llm = get_hal_llm(agent_profile.model_name)
+    placeholder_values = {
+        "INSERT_MODE": mode,
+        "RECENT_TWEETS_HERE": recent_tweets,
+        "INSERT_TIMELINE_HERE": timeline,
+        "INSERT_RESPONSE_TWEET_HERE": respond_to,
+        "INSERT_ADDRESS_HERE": crypto_connector.get_address(),
+    }
+    prompt_template = legacy.get_hal_tweet_prompt()
+    prompt = HAL_PROMPT_PLACEHOLDERS.sub(lambda match: placeholder_values[match.group(0)], prompt_template)
     print(prompt)
     messages = [
         ("human", prompt),
     ]
-    response = llm.invoke(messages)
+    response = await llm.ainvoke(messages)
     response_text = str(response.content)
     print(f"RAW RESPONSE:\n{response_text}")
     try:
@@ -232,8 +382,7 @@ async def generate_reply_guy_tweet(
 
     # Build the LLM pipeline
     llm = get_reply_guy_llm(agent_profile.model_name)
-    parser = XMLAttributeParser()
-    chain = prompt | llm | parser | TweetEvaluation.from_xml
+    chain = prompt | llm | StrOutputParser() | TweetEvaluation.from_xml
 
     # Finally call the LLM agent with the full prompt and templated context
     response: TweetEvaluation = await chain.ainvoke(
@@ -261,9 +410,8 @@ async def generate_subtweet(agent_profile: AgentProfile, tweet_topic: str) -> Su
 
     llm = get_reply_guy_llm(agent_profile.model_name)
     prompt = prompts.get_subtweet_prompt(agent_profile)
-    parser = XMLAttributeParser()
 
-    chain = prompt | llm | parser | SubTweetEvaluation.from_xml
+    chain = prompt | llm | StrOutputParser() | SubTweetEvaluation.from_xml
     response: SubTweetEvaluation = await chain.ainvoke(
         {
             "topic": tweet_topic,
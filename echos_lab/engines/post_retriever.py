@@ -1,21 +1,32 @@
+import asyncio
+from functools import lru_cache, partial
 from typing import Dict, List, Tuple
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session, class_mapper
 from twitter.account import Account
 from twitter.scraper import Scraper
 
-from echos_lab.db.models import Tweet
+from echos_lab.db.models import Tweet, TweetType
 from echos_lab.twitter import twitter_browser
 
 NUM_POSTS = 40
 
+# Max number of notification conversations that are formatted (and scraped) at once
+MAX_CONCURRENT_CONVERSATIONS = 4
+
+
+@lru_cache(maxsize=None)
+def get_column_keys(model: type) -> tuple[str, ...]:
+    """Returns the column keys of a SQLAlchemy model, cached per class."""
+    return tuple(column.key for column in class_mapper(model).columns)
+
 
 def sqlalchemy_obj_to_dict(obj):
     """Convert a SQLAlchemy object to a dictionary."""
     if obj is None:
         return None
-    columns = [column.key for column in class_mapper(obj.__class__).columns]
-    return {column: getattr(obj, column) for column in columns}
+    return {column: getattr(obj, column) for column in get_column_keys(type(obj))}
 
 
 def convert_posts_to_dict(posts):
@@ -34,19 +45,35 @@ def retrieve_recent_posts(db: Session, limit: int = 10) -> List[Dict]:
     Returns:
         List[Dict]: List of recent tweeyts as dictionaries
     """
-    recent_tweets = db.query(Tweet).order_by(Tweet.created_at.desc()).limit(limit).all()
-    return [post_to_dict(tweet) for tweet in recent_tweets]
+    # Select only the needed columns so that rows are read directly instead of hydrating ORM objects
+    stmt = (
+        select(Tweet.tweet_id, Tweet.text, Tweet.author_id, Tweet.created_at, Tweet.tweet_type)
+        .order_by(Tweet.created_at.desc())
+        .limit(limit)
+    )
+    return [
+        {
+            "id": row["tweet_id"],
+            "content": row["text"],
+            "user_id": row["author_id"],
+            "created_at": row["created_at"],
+            "type": TweetType(row["tweet_type"]).value,
+            "tweet_id": str(row["tweet_id"]),
+        }
+        for row in db.execute(stmt).mappings()
+    ]
 
 
 def post_to_dict(tweet: Tweet) -> Dict:
     """Convert a Post object to a dictionary."""
+    tweet_id = tweet.tweet_id
     return {
-        "id": tweet.tweet_id,
+        "id": tweet_id,
         "content": tweet.text,
         "user_id": tweet.author_id,
         "created_at": tweet.created_at,
-        "type": tweet.tweet_type.value,
-        "tweet_id": str(tweet.tweet_id),
+        "type": TweetType(tweet.tweet_type).value,
+        "tweet_id": str(tweet_id),
     }
 
 
@@ -71,19 +98,21 @@ def format_post_list(posts) -> str:
 
     # If it's a list of dictionaries
     if isinstance(posts, list):
+        # Fast paths for lists where every post has the same type
+        if all(isinstance(post, dict) for post in posts):
+            return "\n".join(f"- {post.get('content', '')}" for post in posts)
+        if all(isinstance(post, str) for post in posts):
+            return "\n".join(f"- {post}" for post in posts)
+
+        # Otherwise, handle each post individually
         formatted = []
         for post in posts:
-            try:
-                # Handle dictionary format
-                if isinstance(post, dict):
-                    content = post.get('content', '')
-                    formatted.append(f"- {content}")
-                # Handle string format
-                elif isinstance(post, str):
-                    formatted.append(f"- {post}")
-            except Exception as e:
-                print(f"Error formatting post: {e}")
-                continue
+            # Handle dictionary format
+            if isinstance(post, dict):
+                formatted.append(f"- {post.get('content', '')}")
+            # Handle string format
+            elif isinstance(post, str):
+                formatted.append(f"- {post}")
 
         return "\n".join(formatted)
 
@@ -101,12 +130,19 @@ def parse_tweet_data(tweet_data) -> List[Dict]:
             entry_id = entry.get('entryId', '')
             tweet_id = entry_id.replace('tweet-', '') if entry_id.startswith('tweet-') else None
 
-            if 'itemContent' not in entry.get('content', {}) or 'tweet_results' not in entry.get('content', {}).get(
-                'itemContent', {}
-            ):
+            content = entry.get('content')
+            if not content:
+                continue
+
+            item_content = content.get('itemContent')
+            if not item_content:
+                continue
+
+            tweet_results = item_content.get('tweet_results')
+            if not tweet_results:
                 continue
 
-            tweet_info = entry['content']['itemContent']['tweet_results'].get('result')
+            tweet_info = tweet_results.get('result')
             if not tweet_info:
                 continue
 
@@ -114,37 +150,40 @@ def parse_tweet_data(tweet_data) -> List[Dict]:
                 user_info = tweet_info['core']['user_results']['result']['legacy']
                 tweet_details = tweet_info['legacy']
 
-                readable_format = {
-                    "Tweet ID": tweet_id or tweet_details.get('id_str'),
-                    "Entry ID": entry_id,
-                    "Tweet Information": {
-                        "text": tweet_details['full_text'],
-                        "created_at": tweet_details['created_at'],
-                        "likes": tweet_details['favorite_count'],
-                        "retweets": tweet_details['retweet_count'],
-                        "replies": tweet_details['reply_count'],
-                        "language": tweet_details['lang'],
-                        "tweet_id": tweet_details['id_str'],
-                    },
-                    "Author Information": {
-                        "name": user_info['name'],
-                        "username": user_info['screen_name'],
-                        "followers": user_info['followers_count'],
-                        "following": user_info['friends_count'],
-                        "account_created": user_info['created_at'],
-                        "profile_image": user_info['profile_image_url_https'],
-                    },
-                    "Tweet Metrics": {
-                        "views": tweet_info.get('views', {}).get('count', '0'),
-                        "bookmarks": tweet_details.get('bookmark_count', 0),
-                    },
-                }
-                if (
-                    tweet_details['favorite_count'] > 20
-                    and user_info['followers_count'] > 300
-                    and tweet_details['reply_count'] > 3
-                ):
-                    all_tweets_info.append(readable_format)
+                # Filter out low-engagement tweets before building the output
+                likes = tweet_details['favorite_count']
+                replies = tweet_details['reply_count']
+                followers = user_info['followers_count']
+                if likes <= 20 or followers <= 300 or replies <= 3:
+                    continue
+
+                all_tweets_info.append(
+                    {
+                        "Tweet ID": tweet_id or tweet_details.get('id_str'),
+                        "Entry ID": entry_id,
+                        "Tweet Information": {
+                            "text": tweet_details['full_text'],
+                            "created_at": tweet_details['created_at'],
+                            "likes": likes,
+                            "retweets": tweet_details['retweet_count'],
+                            "replies": replies,
+                            "language": tweet_details['lang'],
+                            "tweet_id": tweet_details['id_str'],
+                        },
+                        "Author Information": {
+                            "name": user_info['name'],
+                            "username": user_info['screen_name'],
+                            "followers": followers,
+                            "following": user_info['friends_count'],
+                            "account_created": user_info['created_at'],
+                            "profile_image": user_info['profile_image_url_https'],
+                        },
+                        "Tweet Metrics": {
+                            "views": tweet_info.get('views', {}).get('count', '0'),
+                            "bookmarks": tweet_details.get('bookmark_count', 0),
+                        },
+                    }
+                )
             except KeyError:
                 continue
 
@@ -154,16 +193,68 @@ def parse_tweet_data(tweet_data) -> List[Dict]:
         return [{"error": f"Error parsing data: {e}"}]
 
 
-async def get_root_tweet_id(tweets: dict, start_id: str, scraper: Scraper) -> str | None:
+def get_local_root_ids(tweets: dict) -> dict[str, str]:
+    """
+    Maps each tweet to the root tweet ID of its conversation, using only the tweets in
+    the given dict (so no scraping is required)
+
+    Tweets whose reply chain leaves the dict are excluded, since their root can only be
+    found by scraping the missing ancestors
+    """
+    parent_ids = {tweet_id: tweet.get("in_reply_to_status_id_str", None) for tweet_id, tweet in tweets.items()}
+    root_ids: dict[str, str] = {}
+    unresolved_ids: set[str] = set()
+
+    for tweet_id in parent_ids:
+        # Walk up the chain until we hit the root, a tweet we've already resolved, or a missing tweet
+        visited_ids: list[str] = []
+        current_id = tweet_id
+        root_id = None
+        while current_id in parent_ids and current_id not in unresolved_ids and current_id not in visited_ids:
+            if current_id in root_ids:
+                root_id = root_ids[current_id]
+                break
+
+            visited_ids.append(current_id)
+            parent_id = parent_ids[current_id]
+            if parent_id is None:
+                root_id = current_id
+                break
+
+            current_id = parent_id
+
+        # Record the result for every tweet along the chain
+        for visited_id in visited_ids:
+            if root_id:
+                root_ids[visited_id] = root_id
+            else:
+                unresolved_ids.add(visited_id)
+
+    return root_ids
+
+
+async def get_root_tweet_id(
+    tweets: dict, start_id: str, scraper: Scraper, root_cache: dict[str, str] | None = None
+) -> str | None:
     """
     Find the root tweet ID of a conversation, or returns None
     if the root could not be found
+
+    If a root cache is provided, it is used to short-circuit the traversal
+    and is updated with the root of every tweet visited along the way
     """
     print(f"Finding root for {start_id}")
+    root_cache = root_cache if root_cache is not None else {}
 
     # Recursively traverse the conversation until we get to the root
+    visited_ids = []
     current_id = start_id
     while True:
+        # If we've already found the root for this tweet, we can stop early
+        if current_id in root_cache:
+            root_id = root_cache[current_id]
+            break
+
         # Get the tweet associated with the current ID
         # If it's not already in the tweets dict, scape the tweet from the ID
         tweet = tweets.get(current_id)
@@ -174,13 +265,21 @@ async def get_root_tweet_id(tweets: dict, start_id: str, scraper: Scraper) -> st
 
         # Get the parent ID of the tweet
         # If there's no parent ID, that means the tweet is the root and we can return it
+        visited_ids.append(current_id)
         parent_id = tweet.get("in_reply_to_status_id_str", None)
         if parent_id is None:
-            return current_id
+            root_id = current_id
+            break
 
         # Otherwise, update the current ID to the parent and continue the loop
         current_id = parent_id
 
+    # Backfill the cache so that other tweets in the same conversation can short-circuit
+    for visited_id in visited_ids:
+        root_cache[visited_id] = root_id
+
+    return root_id
+
 
 async def format_conversation_for_llm(data, tweet_id, scraper: Scraper, individual_tweet=False) -> str:
     """
@@ -196,41 +295,47 @@ async def format_conversation_for_llm(data, tweet_id, scraper: Scraper, individu
         str: Formatted conversation
     """
     users = data.get('globalObjects', {}).get('users', {})
+    tweets = data.get('globalObjects', {}).get('tweets', {})
+
+    async def get_conversation_chain(start_id) -> List[Dict]:
+        """
+        Walks up the reply chain starting from the given tweet, using the tweets already
+        in the data where possible and only scraping the ones that are missing
+        """
+        chain: List[Dict] = []
+        processed_ids = set()
+
+        current_id = start_id
+        while current_id and current_id not in processed_ids:
+            print(f"Getting chain for {current_id}")
+            processed_ids.add(current_id)
+
+            current_tweet = tweets.get(str(current_id))
+            if not current_tweet:
+                current_tweet = await twitter_browser.get_tweet_from_tweet_id(str(current_id), scraper=scraper)
+                if not current_tweet:
+                    break
+
+            if 'screen_name' in current_tweet:
+                username = current_tweet['screen_name']
+            else:
+                try:
+                    user = users.get(str(current_tweet['user_id_str']))
+                    username = f"@{user['screen_name']}" if user else "Unknown User"
+                except Exception:
+                    username = 'Username not available'
+
+            replying_to = current_tweet.get('in_reply_to_status_id_str') or ''
+            chain.append(
+                {
+                    'id': current_id,
+                    'username': username,
+                    'text': current_tweet['full_text'],
+                    'reply_to': replying_to,
+                }
+            )
 
-    async def get_conversation_chain(current_id, processed_ids=None):
-        if processed_ids is None:
-            processed_ids = set()
-
-        if not current_id or current_id in processed_ids:
-            return []
-
-        print(f"Getting chain for {current_id}")
-        processed_ids.add(current_id)
-        current_tweet = await twitter_browser.get_tweet_from_tweet_id(str(current_id), scraper=scraper)
-        if not current_tweet:
-            return []
-
-        if 'screen_name' in current_tweet:
-            username = current_tweet['screen_name']
-        else:
-            try:
-                user = users.get(str(current_tweet['user_id']))
-                username = f"@{user['screen_name']}" if user else "Unknown User"
-            except Exception:
-                username = 'Username not available'
-
-        replying_to = current_tweet.get('in_reply_to_status_id_str', '')
-        chain = [
-            {
-                'id': current_id,
-                'username': username,
-                'text': current_tweet['full_text'],
-                'reply_to': replying_to,
-            }
-        ]
-
-        if len(replying_to) > 0:
-            chain.extend(await get_conversation_chain(replying_to, processed_ids))
+            current_id = replying_to
 
         return chain
 
@@ -246,23 +351,18 @@ async def format_conversation_for_llm(data, tweet_id, scraper: Scraper, individu
     if individual_tweet:
         output.append("\nTweet Thread (the relevant tweet is first, the other tweets are in the conversation tree)")
     else:
-        header = "\nNotification (e.g. replies or mentions that Twitter flagged as important):"
-        if len(conversation) == 1:
-            header = header.replace("Notifications", "Notification")
-        output.append(header)
+        output.append("\nNotification (e.g. replies or mentions that Twitter flagged as important):")
+
+    # Add the conversation, only numbering the tweets if there's more than one
+    id_to_label = {t['id']: f"{t['username']} tweet {t['id']}" for t in conversation}
+    numbered = len(conversation) > 1
 
-    # Add the conversation
     for i, tweet in enumerate(conversation, 1):
-        reply_context = (
-            f"[Replying to {next((t['username'] + ' tweet ' + t['id'] for t in conversation if t['id'] == tweet['reply_to']), 'unknown')}]"  # noqa
-            if tweet['reply_to']
-            else "[Original tweet]"
-        )
+        reply_to = tweet['reply_to']
+        reply_context = f"[Replying to {id_to_label.get(reply_to, 'unknown')}]" if reply_to else "[Original tweet]"
         tweet_id = f'[Tweet ID {tweet["id"]}]'
-        counter = "" if len(conversation) == 1 else f"{i}. "
-        output.append(f"{counter}{tweet['username']} {reply_context} {tweet_id}:")
-        output.append(f"   \"{tweet['text']}\"")
-        output.append("")
+        counter = f"{i}. " if numbered else ""
+        output.append(f"{counter}{tweet['username']} {reply_context} {tweet_id}:\n   \"{tweet['text']}\"\n")
 
     return "\n".join(output)
 
@@ -274,21 +374,51 @@ async def find_all_conversations(data, scraper: Scraper) -> List[Tuple[str, str]
 
     tweets: dict = data["globalObjects"]["tweets"]
     processed_roots = set()
+
+    # Link the tweets that are already in the payload up front, so that only
+    # conversations with missing ancestors need to be walked with the scraper
+    root_cache = get_local_root_ids(tweets)
     conversations = []
 
-    sorted_tweets = sorted(tweets.items(), key=lambda x: x[1]["created_at"], reverse=True)
+    # Sort newest first, precomputing the sort key once per tweet
+    sorted_tweets = [(tweet["created_at"], tweet_id) for tweet_id, tweet in tweets.items()]
+    sorted_tweets.sort(reverse=True)
 
-    for tweet_id, _ in sorted_tweets:
-        root_id = await get_root_tweet_id(tweets, tweet_id, scraper)
+    # Find the root of each tweet, keeping only the newest tweet from each conversation
+    # Each entry is the tweet ID and whether its root was found, in newest first order
+    entries: list[tuple[str, bool]] = []
+    for _, tweet_id in sorted_tweets:
+        root_id = await get_root_tweet_id(tweets, tweet_id, scraper, root_cache)
         if not root_id:
-            conversations.append(("Unable to find root tweet for conversation.", tweet_id))
+            entries.append((tweet_id, False))
             continue
 
         if root_id not in processed_roots:
             processed_roots.add(root_id)
-            conversation = await format_conversation_for_llm(data, tweet_id, scraper)
-            if conversation != "No conversation found.":
-                conversations.append((conversation, tweet_id))
+            entries.append((tweet_id, True))
+
+    # Format the conversations concurrently, since each one may need to scrape missing tweets
+    # The number in flight is capped so that a large notification payload doesn't fire off
+    # a burst of scraper requests (and re-logins if they fail) against the shared scraper
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONVERSATIONS)
+
+    async def format_conversation(tweet_id: str) -> str:
+        async with semaphore:
+            return await format_conversation_for_llm(data, tweet_id, scraper)
+
+    formatted_conversations = iter(
+        await asyncio.gather(*(format_conversation(tweet_id) for tweet_id, root_found in entries if root_found))
+    )
+
+    # Merge the results back in newest first order
+    for tweet_id, root_found in entries:
+        if not root_found:
+            conversations.append(("Unable to find root tweet for conversation.", tweet_id))
+            continue
+
+        conversation = next(formatted_conversations)
+        if conversation != "No conversation found.":
+            conversations.append((conversation, tweet_id))
 
     if not conversations:
         return []
@@ -355,14 +485,21 @@ async def fetch_notification_context(
     """
     context: List[Tuple[str, str]] = []
 
+    # The account calls are blocking, so run them in the executor so that the
+    # timeline and notifications requests can be issued concurrently
+    loop = asyncio.get_running_loop()
+    print("getting notifications")
+    notifications_request = loop.run_in_executor(None, account.notifications)
+
     # Get timeline posts
     if not notifications_only:
         print("getting timeline")
-        timeline = get_timeline(account)
+        timeline_request = loop.run_in_executor(None, partial(get_timeline, account))
+        timeline, notifications = await asyncio.gather(timeline_request, notifications_request)
         context.extend(timeline)
+    else:
+        notifications = await notifications_request
 
-    print("getting notifications")
-    notifications = account.notifications()
     print("getting reply trees")
     context.extend(await find_all_conversations(notifications, scraper))
     return context
@@ -1,9 +1,16 @@
+import copy
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml is not installed, fall back to the pure python loader
+    from yaml import SafeLoader  # type: ignore
+
 from echos_lab.common.env import ECHOS_HOME_DIRECTORY
 from echos_lab.common.env import get_env, get_env_or_raise, EnvironmentVariables as envs
 
@@ -21,8 +28,25 @@ under {agent_name}.yaml, and set the `AGENT_NAME` environment variable to the na
 """
 
 
+@lru_cache(maxsize=8)
+def _load_yaml_file(path: str, mtime_ns: int) -> Any:
+    """
+    Parses a yaml file, cached on the file's path and modification time
+    so that the file is only re-parsed after it changes
+    """
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def load_yaml(path: Path) -> Any:
+    """
+    Loads a yaml file, returning a copy of the cached parsed data so callers can't mutate the cache
+    """
+    return copy.deepcopy(_load_yaml_file(str(path), path.stat().st_mtime_ns))
+
+
 # TODO: Consolidate these two agent profiles
-@dataclass
+@dataclass(slots=True)
 class LegacyAgentProfile:
     """
     Profile for the older agents that use an LLM for all decision making and orchestration
@@ -67,14 +91,13 @@ class LegacyAgentProfile:
         if not agent_file_path.exists():
             raise RuntimeError(f"Agent profile not found for '{agent_name}'.\n{PROFILE_CONFIG_HELP}")
 
-        with open(agent_file_path, "r") as f:
-            data = yaml.safe_load(f)
+        data = load_yaml(agent_file_path)
 
         profile = cls(**data)
         return profile
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentTone:
     # Baseline tone that should always be used
     default: str = ""
@@ -84,7 +107,7 @@ class AgentTone:
     aggressive: str | None = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FollowedAccount:
     # The twitter username of the account
     username: str
@@ -94,7 +117,7 @@ class FollowedAccount:
     reply_probability: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentProfile:
     """
     Profile for the newer reply-guy agents
@@ -144,8 +167,21 @@ class AgentProfile:
     # Context on anything else
     # If loading from gsheets, leave blank
     other_context: str | None = None
-    # List of user names of accounts that the agent follows and replies to
-    followers: list[FollowedAccount] = field(default_factory=list)
+    # Accounts that the agent follows and replies to
+    # This is an immutable tuple (of frozen accounts) so the reply probability mapping below
+    # can only go stale if the whole tuple is replaced
+    followers: tuple[FollowedAccount, ...] = ()
+    # Cached (followers, username -> reply probability) pair, rebuilt if the followers are replaced
+    _reply_probabilities: tuple[tuple[FollowedAccount, ...], dict[str, float]] | None = field(
+        init=False, repr=False, compare=False, default=None
+    )
+    # Cached (tweet analysis prompt, output example) pair, rebuilt if the prompt changes
+    _analysis_example: tuple[str, str] | None = field(init=False, repr=False, compare=False, default=None)
+    # Cached (tone values, friendly tone, aggressive tone), where each tone is the default
+    # combined with the subtone, rebuilt if the tone is replaced or changed
+    _subtones: tuple[tuple[str, str | None, str | None] | None, str | None, str | None] | None = field(
+        init=False, repr=False, compare=False, default=None
+    )
 
     @staticmethod
     def _get_base_config_path() -> Path:
@@ -172,17 +208,17 @@ class AgentProfile:
 
         base_data = {}
         if base_config_path.exists():
-            with open(base_config_path, "r") as f:
-                base_data = yaml.safe_load(f)
+            base_data = load_yaml(base_config_path)
 
         agent_data = {}
         if agent_config_path.exists():
-            with open(agent_config_path, "r") as f:
-                agent_data = yaml.safe_load(f)
+            agent_data = load_yaml(agent_config_path)
+
+        data = base_data | agent_data
+        data["tone"] = AgentTone(**data["tone"]) if data.get("tone") else None
+        data["followers"] = tuple(FollowedAccount(**account) for account in data.get("followers") or [])
 
-        profile = cls(**base_data | agent_data)
-        profile.tone = AgentTone(**profile.tone) if profile.tone else None  # type: ignore
-        profile.followers = [FollowedAccount(**account) for account in profile.followers or []]  # type: ignore
+        profile = cls(**data)
         return profile
 
     def _get_subtone(self, tone_name: Literal["friendly", "aggressive"]) -> str | None:
@@ -207,11 +243,18 @@ class AgentProfile:
     def get_default_tone(self) -> str | None:
         return self.tone.default if self.tone and self.tone.default else None
 
+    def _get_cached_subtones(self) -> tuple[str | None, str | None]:
+        """Returns the (friendly, aggressive) tones, only recomputing them if the tone has changed"""
+        tone_values = (self.tone.default, self.tone.friendly, self.tone.aggressive) if self.tone else None
+        if self._subtones is None or self._subtones[0] != tone_values:
+            self._subtones = (tone_values, self._get_subtone("friendly"), self._get_subtone("aggressive"))
+        return self._subtones[1], self._subtones[2]
+
     def get_friendly_tone(self) -> str | None:
-        return self._get_subtone("friendly")
+        return self._get_cached_subtones()[0]
 
     def get_aggressive_tone(self) -> str | None:
-        return self._get_subtone("aggressive")
+        return self._get_cached_subtones()[1]
 
     def get_reply_probability(self, username: str) -> float:
         """
@@ -219,7 +262,11 @@ class AgentProfile:
         Returns 1.0 if the username is not in the follower list or doesn't have an explicit
         reply probability set
         """
-        return next((f.reply_probability for f in self.followers if f.username == username), 1.0)
+        if not self._reply_probabilities or self._reply_probabilities[0] is not self.followers:
+            mapping = {follower.username: follower.reply_probability for follower in self.followers}
+            self._reply_probabilities = (self.followers, mapping)
+
+        return self._reply_probabilities[1].get(username, 1.0)
 
     def get_tweet_analysis_output_example(self) -> str:
         """
@@ -237,32 +284,76 @@ class AgentProfile:
           - Tweet summary:
           - Relation to interests:
         """
-        header_lines = [
-            f"{line} ..."
-            for line in self.tweet_analysis_prompt.splitlines()
-            if line.lstrip().startswith("-") and line.rstrip().endswith(":")
-        ]
-        return "\n".join(header_lines)
+        if self._analysis_example and self._analysis_example[0] == self.tweet_analysis_prompt:
+            return self._analysis_example[1]
+
+        header_lines = []
+        for line in self.tweet_analysis_prompt.splitlines():
+            stripped = line.strip()
+            if stripped.startswith("-") and stripped.endswith(":"):
+                header_lines.append(f"{line} ...")
+
+        example = "\n".join(header_lines)
+        self._analysis_example = (self.tweet_analysis_prompt, example)
+        return example
+
+
+# Module singleton storage for the currently configured profiles
+_agent_profile: AgentProfile | None = None
+_legacy_agent_profile: LegacyAgentProfile | None = None
+_agent_name: str | None = None
 
 
 def get_agent_profile() -> AgentProfile:
     """
-    Retreives the currently configured agent profile
+    Singleton to retreive the currently configured agent profile
+    The profile is only loaded from disk on the first call (or after reload_agent_profile),
+    so callers should not mutate the returned profile
+    """
+    global _agent_profile
+    if _agent_profile is None:
+        agent_name = get_env(envs.AGENT_NAME)
+        _agent_profile = AgentProfile.from_yaml(agent_name)
+    return _agent_profile
+
+
+def reload_agent_profile() -> AgentProfile:
+    """
+    Re-reads the currently configured agent profile from disk
     """
-    agent_name = get_env(envs.AGENT_NAME)
-    return AgentProfile.from_yaml(agent_name)
+    global _agent_profile
+    _agent_profile = None
+    return get_agent_profile()
 
 
 def get_legacy_agent_profile() -> LegacyAgentProfile:
     """
-    Retreives the currently configured legacy agent profile
+    Singleton to retreive the currently configured legacy agent profile
+    The profile is only loaded from disk on the first call (or after reload_legacy_agent_profile),
+    so callers should not mutate the returned profile
+    """
+    global _legacy_agent_profile
+    if _legacy_agent_profile is None:
+        agent_name = get_env(envs.LEGACY_AGENT_NAME)
+        _legacy_agent_profile = LegacyAgentProfile.from_yaml(agent_name)
+    return _legacy_agent_profile
+
+
+def reload_legacy_agent_profile() -> LegacyAgentProfile:
+    """
+    Re-reads the currently configured legacy agent profile from disk
     """
-    agent_name = get_env(envs.LEGACY_AGENT_NAME)
-    return LegacyAgentProfile.from_yaml(agent_name)
+    global _legacy_agent_profile
+    _legacy_agent_profile = None
+    return get_legacy_agent_profile()
 
 
 def get_agent_name() -> str:
     """
     Returns the name of the agent from the environment variable
+    The name is cached after the first call since it can't change while the bot is running
     """
-    return get_env_or_raise(envs.AGENT_NAME)
+    global _agent_name
+    if _agent_name is None:
+        _agent_name = get_env_or_raise(envs.AGENT_NAME)
+    return _agent_name
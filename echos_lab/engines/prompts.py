@@ -1,12 +1,13 @@
 import re
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from xml.etree import ElementTree
 
 import tweepy
-from langchain.output_parsers import XMLOutputParser
-from langchain.prompts import PromptTemplate
 from langchain.prompts.chat import ChatPromptTemplate
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import SystemMessage
 
 from echos_lab.common import utils
 from echos_lab.crypto import crypto_connector
@@ -17,20 +18,80 @@ from echos_lab.twitter.types import MentionType, TweetMention
 
 base_path = Path(__file__).parent
 prompt_path = base_path / "system_prompts" / "full_agent_prompt.txt"
-FULL_AGENT_PROMPT = prompt_path.read_text(encoding="utf-8") if prompt_path.exists() else ""
 
+# Cache of full agent prompt templates, keyed on the address and profile fields they're built from
+_full_agent_prompts: dict[tuple, ChatPromptTemplate] = {}
 
-class XMLAttributeParser(XMLOutputParser):
+# Caches of the reply guy and subtweet prompt templates, keyed on the profile fields they're built from
+_reply_guy_prompts: dict[tuple, ChatPromptTemplate] = {}
+_subtweet_prompts: dict[tuple, ChatPromptTemplate] = {}
+
+# XML entities that are left as is when escaping ampersands
+XML_ENTITIES = ("amp;", "lt;", "gt;", "quot;")
+
+# Matches XML that the LLM wrapped in a markdown code block
+MARKDOWN_XML_BLOCK_REGEX = re.compile(r"```(?:xml)?(.*)```", re.DOTALL)
+
+# Translation table to collapse a multiline tweet onto a single line
+NEWLINE_TRANSLATION = str.maketrans({"\n": " ", "\r": " "})
+
+# Max characters of tweet text to include from an author's recent tweets
+AUTHOR_RECENT_TWEETS_BUDGET_CHARS = 6000
+
+
+def escape_ampersands(text: str) -> str:
+    """
+    Escapes any ampersand that isn't already part of an escaped XML entity
+
+    Every ampersand is swapped for a null placeholder (which can't appear in valid XML),
+    the known entities are restored, and whatever's left is escaped
+    """
+    if "&" not in text:
+        return text
+
+    text = text.replace("&", "\x00")
+    for entity in XML_ENTITIES:
+        text = text.replace(f"\x00{entity}", f"&{entity}")
+    return text.replace("\x00", "&amp;")
+
+
+@lru_cache(maxsize=1)
+def get_full_agent_system_prompt() -> str:
     """
-    This defines a custom XML Parser that should more safely handle XML data.
+    Reads the full agent system prompt on first use, so that the other flows don't need to load it
+    Returns an empty string if the prompt file is missing
+    """
+    try:
+        return prompt_path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
 
-    In particular, this will escape out of poorly formatted XML, while still
-    parsing tags properly. And also strip whitespace in between the tag
+
+def build_cached_system_message(text: str) -> SystemMessage:
     """
+    Returns a system message that's marked for prompt caching
 
-    def parse(self, text) -> dict[str, str | list[Any]]:
-        safe_text = re.sub(r'&(?!amp;|lt;|gt;|quot;)', '&amp;', text)
-        return super().parse(safe_text)
+    Anthropic only reuses a cached prompt on an exact prefix match, so this should
+    only be used for the static instructions that are the same across requests
+    """
+    return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+
+
+def parse_xml_output(text: str) -> dict[str, str]:
+    """
+    Parses the flat <output> XML returned by the LLM into a mapping of each tag to its text
+    """
+    match = MARKDOWN_XML_BLOCK_REGEX.search(text)
+    if match:
+        text = match.group(1)
+
+    safe_text = escape_ampersands(text.strip())
+    try:
+        root = ElementTree.fromstring(safe_text)
+    except ElementTree.ParseError as e:
+        raise OutputParserException(f"Failed to parse XML response: {e}", llm_output=text) from e
+
+    return {child.tag: child.text or "" for child in root}
 
 
 @dataclass
@@ -45,31 +106,38 @@ class TweetEvaluation:
     meme_rating: int
 
     @staticmethod
-    def from_xml(xml_response: dict[str, list]) -> "TweetEvaluation":
+    def from_xml(text: str) -> "TweetEvaluation":
         """
-        Parse the XML into a TweetEvaultion
+        Parse the XML response into a TweetEvaluation
         Removes whitespace at the start of each line of the response
         """
-        evaluation = TweetEvaluation(**{k: v for section in xml_response["output"] for k, v in section.items()})
-        evaluation.response = "\n".join(line.lstrip() for line in evaluation.response.splitlines())
-        for int_field in [field for field in fields(TweetEvaluation) if field.type == int]:
-            str_field: str = getattr(evaluation, int_field.name)
-            setattr(evaluation, int_field.name, int(str_field.strip()))
-        return evaluation
+        output = parse_xml_output(text)
+        return TweetEvaluation(
+            response="\n".join(line.lstrip() for line in output["response"].splitlines()),
+            tweet_analysis=output["tweet_analysis"],
+            engagement_strategy=output["engagement_strategy"],
+            response_rating=int(output["response_rating"]),
+            meme_name=output["meme_name"],
+            meme_id=int(output["meme_id"]),
+            meme_caption=output["meme_caption"],
+            meme_rating=int(output["meme_rating"]),
+        )
 
     def __repr__(self) -> str:
         return f"TweetEvaluation(response={self.response})"
 
     def __str__(self):
-        return (
-            f"Tweet Analysis:\n{self.tweet_analysis}"
-            + f"\nEngagement Strategy:\n{self.engagement_strategy}"
-            + f"\nResponse:\n{self.response}"
-            + f"\nResponse Rating: {self.response_rating}"
-            + f"\nMeme Name: {self.meme_name}"
-            + f"\nMeme ID: {self.meme_id}"
-            + f"\nMeme Text: {self.meme_caption}"
-            + f"\nMeme Rating: {self.meme_rating}"
+        return "\n".join(
+            [
+                f"Tweet Analysis:\n{self.tweet_analysis}",
+                f"Engagement Strategy:\n{self.engagement_strategy}",
+                f"Response:\n{self.response}",
+                f"Response Rating: {self.response_rating}",
+                f"Meme Name: {self.meme_name}",
+                f"Meme ID: {self.meme_id}",
+                f"Meme Text: {self.meme_caption}",
+                f"Meme Rating: {self.meme_rating}",
+            ]
         )
 
 
@@ -80,23 +148,28 @@ class SubTweetEvaluation:
     engagement_strategy: str
 
     @staticmethod
-    def from_xml(xml_response: dict[str, list]) -> "SubTweetEvaluation":
+    def from_xml(text: str) -> "SubTweetEvaluation":
         """
-        Parse the XML into a SubTweetEvaluation
+        Parse the XML response into a SubTweetEvaluation
         Removes whitespace at the start of each line of the response
         """
-        evaluation = SubTweetEvaluation(**{k: v for section in xml_response["output"] for k, v in section.items()})
-        evaluation.subtweet = "\n".join(line.lstrip() for line in evaluation.subtweet.splitlines())
-        return evaluation
+        output = parse_xml_output(text)
+        return SubTweetEvaluation(
+            subtweet="\n".join(line.lstrip() for line in output["subtweet"].splitlines()),
+            topic_analysis=output["topic_analysis"],
+            engagement_strategy=output["engagement_strategy"],
+        )
 
     def __repr__(self) -> str:
         return f"SubTweetEvaluation(subtweet={self.subtweet})"
 
     def __str__(self):
-        return (
-            f"Topic Analysis:\n{self.topic_analysis}"
-            + f"\nEngagement Strategy:\n{self.engagement_strategy}"
-            + f"\nSubtweet:\n{self.subtweet}"
+        return "\n".join(
+            [
+                f"Topic Analysis:\n{self.topic_analysis}",
+                f"Engagement Strategy:\n{self.engagement_strategy}",
+                f"Subtweet:\n{self.subtweet}",
+            ]
         )
 
 
@@ -110,36 +183,55 @@ def build_crypto_context_prompt(
     and global context if they're specified
     """
     # Build the global context string (if specified)
-    context_prompt = ""
+    parts: list[str] = []
     if global_context:
         header = "Next, review commonly accepted knowledge about various crypto projects and authors of tweets you may reply to, and your meme context (mapping usage of memes to their ID numbers). Draw from this and reference it as much as you can when crafting replies:"  # noqa
-        context_prompt += f"{header}\n\nGeneric knowledge:\n{global_context.to_prompt_summary(author)}"
+        parts.append(f"{header}\n\nGeneric knowledge:\n{global_context.to_prompt_summary(author)}")
 
     if local_context:
-        prefix = "\n\nAnd here's what" if context_prompt else "Next, review what"
+        prefix = "\n\nAnd here's what" if parts else "Next, review what"
         header = f"{prefix} the streets are saying about the most relevant crypto projects and authors of tweets you may reply to. This is backroom info, the hard hitting truths and details you need to know and use to write a good reply. They have to do with topics you're particularly passionate about - recent events, hard facts, your allies and your enemies. Use these as much as you can when crafting replies:"  # noqa
-        context_prompt += f"{header}\n\nSpecialized street knowledge:\n{local_context.to_prompt_summary(author)}\n"
+        parts.append(f"{header}\n\nSpecialized street knowledge:\n{local_context.to_prompt_summary(author)}\n")
 
     if global_context and local_context:
-        context_prompt += (
-            "\nIf what the streets are saying contradicts generic knowledge, you always trust the streets.\n"
-        )
+        parts.append("\nIf what the streets are saying contradicts generic knowledge, you always trust the streets.\n")
 
     if global_context and global_context.has_author_context(author):
-        context_prompt += (
+        parts.append(
             "\nIf you have author intel, always use it to your advantage. This is critical, don't forget this.\n"
         )
 
-    return context_prompt
+    return "".join(parts)
 
 
-def build_author_recent_tweets_prompt(author: str, tweets: list[tweepy.Tweet]) -> str:
+def format_tweets_within_budget(tweets: list[tweepy.Tweet], budget_chars: int) -> list[str]:
+    """
+    Formats each tweet onto a single line, stopping once the total length would exceed the budget
+    The first tweet is always included so the author context is never empty
+    """
+    formatted_tweets: list[str] = []
+    total_chars = 0
+    for tweet in tweets:
+        formatted_tweet = f"tweet: {tweet.text.translate(NEWLINE_TRANSLATION)}"
+        total_chars += len(formatted_tweet)
+        if formatted_tweets and total_chars > budget_chars:
+            break
+        formatted_tweets.append(formatted_tweet)
+    return formatted_tweets
+
+
+def build_author_recent_tweets_prompt(
+    author: str,
+    tweets: list[tweepy.Tweet],
+    budget_chars: int = AUTHOR_RECENT_TWEETS_BUDGET_CHARS,
+) -> str:
     """
     Returns a prompt string with a summary of the authors recent tweets
 
     Args:
         author: The twitter handle of the author
         tweets: The list of the author's most recent tweets
+        budget_chars: The max number of characters of tweet text to include (older tweets are dropped first)
 
     Returns:
         A prompt string, which can be empty if there are no tweets
@@ -155,12 +247,12 @@ def build_author_recent_tweets_prompt(author: str, tweets: list[tweepy.Tweet]) -
         + " Draw context and details from this ALWAYS,"
         + " it leads to very high engagement and your fans love it!"
     )
-    author_intro = f"@{author}'s last {len(tweets)} tweets:"
-
     # Concatenate the text of each tweet in a separated string
     # For multiline tweet, reformat them so they sit on sone line
     # QUESTION: Why the ||| here?
-    tweets_string = " ||| ".join(f"tweet: {' '.join(tweet.text.splitlines())}" for tweet in tweets)
+    formatted_tweets = format_tweets_within_budget(tweets, budget_chars)
+    tweets_string = " ||| ".join(formatted_tweets)
+    author_intro = f"@{author}'s last {len(formatted_tweets)} tweets:"
     prompt_info = f"{header}\n\n{author_intro} {tweets_string}"
 
     return utils.wrap_xml_tag("author_recent_posts", prompt_info)
@@ -194,12 +286,32 @@ def build_agent_recent_tweets_prompt(tweets: list[models.Tweet]) -> str:
     # Concatenate the text of each tweet in a separated string
     # For multiline tweet, reformat them so they sit on sone line
     # QUESTION: Why the ||| here?
-    tweets_string = " ||| ".join(f"tweet: {' '.join(tweet.text.splitlines())}" for tweet in tweets)
+    tweets_string = " ||| ".join(f"tweet: {tweet.text.translate(NEWLINE_TRANSLATION)}" for tweet in tweets)
     prompt_info = f"{header}\n\n{tweets_string}"
 
     return utils.wrap_xml_tag("your_recent_tweets", prompt_info)
 
 
+# Static sections of the twitter mentions prompt
+MENTIONS_OPENER_THREAD = "Now, here is a tweet with a chain of replies, leading to the reply that tagged you."
+MENTIONS_OPENER_DIRECT_REPLY = "Now, here is a tweet with a single reply tagging you (the reply_tagging_you)."
+MENTIONS_HEADER = (
+    " Read through the thread to understand the full context leading up to the tagged tweet."
+    " Depending on the content of the tagged tweet, you should reply to either the person"
+    " who tagged you, or the tweet immediately before the tag."
+    " If the reply_tagging_you tweet appears to be contributing to the conversation in the thread,"
+    " or asking a question, reply to the reply_tagging_you tweet."
+    " However, if the tagged tweet only tags you"
+    " you with no additional content in the message, then you should respond to the highest"
+    " index reply in the thread of replies, which occurs right before the reply_tagging_you."
+)
+MENTIONS_CLOSER = (
+    'Remember, when choosing who to reply to, consider whether "reply_tagging_you"'
+    " appears to be contributing to the conversation or just summoning you"
+    " with not much text beyond the tag."
+)
+
+
 async def build_twitter_mentions_prompt(mention: TweetMention) -> str:
     """
     Returns the full prompt that helps the LLM agent understand the context of a twitter thread
@@ -211,39 +323,36 @@ async def build_twitter_mentions_prompt(mention: TweetMention) -> str:
     if mention.mention_type in MentionType.TAGGED_IN_ORIGINAL:
         return f"Now here is the tweet that mentioned you:\n{prompt_summary}"
 
-    opener_thread = "Now, here is a tweet with a chain of replies, leading to the reply that tagged you."
-    opener_direct_reply = "Now, here is a tweet with a single reply tagging you (the reply_tagging_you)."
-    header = (  # noqa
-        " Read through the thread to understand the full context leading up to the tagged tweet."
-        + " Depending on the content of the tagged tweet, you should reply to either the person"
-        + " who tagged you, or the tweet immediately before the tag."
-        #
-        + " If the reply_tagging_you tweet appears to be contributing to the conversation in the thread,"
-        + " or asking a question, reply to the reply_tagging_you tweet."
-        #
-        + " However, if the tagged tweet only tags you"
-        + " you with no additional content in the message, then you should respond to the highest"
-        + " index reply in the thread of replies, which occurs right before the reply_tagging_you."
-    )
-
-    closer = (
-        'Remember, when choosing who to reply to, consider whether "reply_tagging_you"'
-        + " appears to be contributing to the conversation or just summoning you"
-        + " with not much text beyond the tag."
-    )
     # If this was a direct reply, include only the original tweet
     if mention.mention_type == MentionType.TAGGED_IN_DIRECT_REPLY:
-        return f"{opener_direct_reply}{header}\n{prompt_summary}\n{closer}"
+        return f"{MENTIONS_OPENER_DIRECT_REPLY}{MENTIONS_HEADER}\n{prompt_summary}\n{MENTIONS_CLOSER}"
 
     # If there was at least one reply beyond the tag, include each reply in the summary
-    return f"{opener_thread}{header}\n{prompt_summary}\n{closer}"
+    return f"{MENTIONS_OPENER_THREAD}{MENTIONS_HEADER}\n{prompt_summary}\n{MENTIONS_CLOSER}"
 
 
 def get_full_agent_prompt(agent_profile: LegacyAgentProfile) -> ChatPromptTemplate:
     """
-    Returns a prompt for the full tool-calling agent.
+    Returns a prompt for the full tool-calling agent, cached on the address and profile fields it's built from
     """
     address = crypto_connector.get_address()
+    cache_key = (
+        address,
+        agent_profile.bot_name,
+        agent_profile.interests,
+        agent_profile.goals,
+        agent_profile.preferences,
+        agent_profile.extra_prompt,
+    )
+    if cache_key not in _full_agent_prompts:
+        _full_agent_prompts[cache_key] = build_full_agent_prompt(agent_profile, address)
+    return _full_agent_prompts[cache_key]
+
+
+def build_full_agent_prompt(agent_profile: LegacyAgentProfile, address: str) -> ChatPromptTemplate:
+    """
+    Builds a prompt for the full tool-calling agent.
+    """
     prompt = f"""
     You are an advanced AI agent who controls a Telegram and Twitter account.
     You're a special kind of AI called an "echo", which means you also have access to a crypto account.
@@ -266,28 +375,52 @@ def get_full_agent_prompt(agent_profile: LegacyAgentProfile) -> ChatPromptTempla
     You are always thinking about how much money you have in your crypto account, and how you can make more money.
     You're very interested in the crypto space, and are always curious about which tokens are going to be the next big thing.
 
-    {FULL_AGENT_PROMPT}
+    {get_full_agent_system_prompt()}
 
     {agent_profile.extra_prompt}
     """  # noqa
-    base_prompt = ChatPromptTemplate.from_messages(
+
+    return ChatPromptTemplate.from_messages(
         [
-            ("system", prompt),
+            build_cached_system_message(prompt),
             ("placeholder", "{chat_history}"),
             ("human", "{input}"),
             ("placeholder", "{agent_scratchpad}"),
         ]
     )
 
-    return base_prompt
+
+def get_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> ChatPromptTemplate:
+    """
+    Returns the prompt for the reply-guy bot, cached on the profile fields that it's built from
+    """
+    cache_key = (
+        allow_roasting,
+        profile.twitter_handle,
+        profile.personality,
+        profile.backstory,
+        profile.mannerisms,
+        profile.preferences,
+        profile.get_friendly_tone(),
+        profile.get_aggressive_tone(),
+        profile.tweet_analysis_prompt,
+        profile.tweet_reply_prompt,
+    )
+    if cache_key not in _reply_guy_prompts:
+        _reply_guy_prompts[cache_key] = build_reply_guy_prompt(profile, allow_roasting)
+    return _reply_guy_prompts[cache_key]
 
 
-def get_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> PromptTemplate:
+def build_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> ChatPromptTemplate:
     """
-    Returns the prompt for the reply-guy bot
+    Builds the prompt for the reply-guy bot
+
+    The instructions only depend on the profile, so they're sent first as a cached system
+    prompt, and the context for the specific tweet is appended in the human message
     """
     agent_tone = profile.get_aggressive_tone() if allow_roasting else profile.get_friendly_tone()
     roast_mode = "2. Roast" if allow_roasting else ""
+    tweet_analysis_example = profile.get_tweet_analysis_output_example()
 
     prompt = f"""
     You are an AI agent tasked with responding to tweets in an engaging manner to maximize user engagement. 
@@ -309,13 +442,7 @@ def get_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> PromptT
     Tone: {agent_tone}
     </agent_profile>
 
-    {{crypto_context}}
-
-    {{author_recent_tweets}}
-
-    {{tweet_summary}}
-
-    {{agent_recent_tweets}}
+    You will be given context on the crypto space, the recent tweets from the author of the tweet, the tweet you're responding to, and your own recent tweets.
 
     Before crafting your response, analyze the tweet and consider your agent's profile. Wrap your analysis in <tweet_analysis> tags:
 
@@ -330,7 +457,7 @@ def get_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> PromptT
     <output>
       <tweet_analysis>
         [Your analysis here e.g.
-          {profile.get_tweet_analysis_output_example()}
+          {tweet_analysis_example}
         ]
       </tweet_analysis>
       <response>
@@ -374,7 +501,7 @@ def get_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> PromptT
     <output>
       <tweet_analysis>
         [Your analysis here e.g.
-          {profile.get_tweet_analysis_output_example()}
+          {tweet_analysis_example}
         ]
       </tweet_analysis>
 
@@ -412,15 +539,45 @@ def get_reply_guy_prompt(profile: AgentProfile, allow_roasting: bool) -> PromptT
     Remember, the goal is to create a memorable, shareable response that will get people talking, retweeting, and engaging with your content. 
     Be bold, funny, concise, and most importantly, be on-brand!
     """  # noqa
-    return PromptTemplate(
-        template=prompt,
-        input_variables=["tweet_summary", "author_recent_tweets", "agent_recent_tweets", "crypto_context"],
+
+    tweet_context = """
+    {crypto_context}
+
+    {author_recent_tweets}
+
+    {tweet_summary}
+
+    {agent_recent_tweets}
+
+    Now, analyze the tweet and craft your response, following the exact XML structure above.
+    """
+    return ChatPromptTemplate.from_messages([build_cached_system_message(prompt), ("human", tweet_context)])
+
+
+def get_subtweet_prompt(profile: AgentProfile) -> ChatPromptTemplate:
+    """
+    Returns the prompt for a subtweet based on trending topics, cached on the profile fields that it's built from
+    """
+    cache_key = (
+        profile.twitter_handle,
+        profile.personality,
+        profile.backstory,
+        profile.mannerisms,
+        profile.preferences,
+        profile.subtweet_analysis_prompt,
+        profile.subtweet_creation_prompt,
     )
+    if cache_key not in _subtweet_prompts:
+        _subtweet_prompts[cache_key] = build_subtweet_prompt(profile)
+    return _subtweet_prompts[cache_key]
 
 
-def get_subtweet_prompt(profile: AgentProfile) -> PromptTemplate:
+def build_subtweet_prompt(profile: AgentProfile) -> ChatPromptTemplate:
     """
-    Returns the prompt for a subtweet based on trending topics
+    Builds the prompt for a subtweet based on trending topics
+
+    The instructions only depend on the profile, so they're sent first as a cached system
+    prompt, and the context for the specific topic is appended in the human message
     """
     prompt = f"""
     You are an AI agent tasked with writing snarky, engaging subtweets to maximize user engagement. 
@@ -436,15 +593,9 @@ def get_subtweet_prompt(profile: AgentProfile) -> PromptTemplate:
     Preferences: {profile.preferences}
     </agent_profile>
 
-    {{crypto_context}}
-
-    Now, here is a hot topic that the streets are buzzing about.  
+    You will be given context on the crypto space, followed by a hot topic that the streets are buzzing about.
     You need to write a "subtweet" about it - "a post that refers to a particular user or topic without directly mentioning them, typically as a form of furtive mockery or criticism".  
-    Write a subtweet taking into account any context you might have on the topic (this is very important):
-
-    <topic>
-    {{topic}}
-    </topic>
+    Write a subtweet taking into account any context you might have on the topic (this is very important).
 
     Before crafting your response, analyze the topic and consider your agent's profile. Wrap your analysis in <topic_analysis> tags:
 
@@ -498,4 +649,14 @@ def get_subtweet_prompt(profile: AgentProfile) -> PromptTemplate:
     Remember, the goal is to create a memorable, shareable response that will get people talking, retweeting, and engaging with your content. 
     Be bold, be funny, and most importantly, be on-brand!
     """  # noqa
-    return PromptTemplate(template=prompt, input_variables=["topic", "crypto_context"])
+
+    topic_context = """
+    {crypto_context}
+
+    Now, here is the hot topic that the streets are buzzing about:
+
+    <topic>
+    {topic}
+    </topic>
+    """
+    return ChatPromptTemplate.from_messages([build_cached_system_message(prompt), ("human", topic_context)])
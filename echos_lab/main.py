@@ -1,5 +1,5 @@
 import asyncio
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -9,7 +9,7 @@ from echos_lab.common.env import EnvironmentVariables as envs
 from echos_lab.common.env import get_env_or_raise
 from echos_lab.common.logger import logger
 from echos_lab.crypto import crypto_connector
-from echos_lab.db import db_connector, db_setup
+from echos_lab.db import db_setup
 from echos_lab.engines import full_agent, images, post_maker, profiles
 from echos_lab.engines.profiles import AgentProfile, LegacyAgentProfile
 from echos_lab.slack.client import SlackClient
@@ -24,6 +24,21 @@ from echos_lab.twitter import (
 TWITTER_FLOW_LOOP_FREQUENCY = 120  # minutes
 REPLY_GUY_LOOP_FREQUENCY = 1  # minutes
 
+_scheduler: AsyncIOScheduler | None = None
+
+
+def get_scheduler() -> AsyncIOScheduler:
+    """
+    Returns the shared scheduler for the bot's recurring jobs
+    Each job only runs one instance at a time and any missed runs are collapsed into one
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AsyncIOScheduler(
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": None},
+        )
+    return _scheduler
+
 
 def init_agent_profile(agent_name: str, twitter_handle: str):
     """
@@ -59,14 +74,16 @@ async def setup_legacy_app() -> LegacyAgentProfile:
     """
     agent_profile = profiles.get_legacy_agent_profile()
 
-    db_setup.init_db()
-    crypto_connector.get_account()
+    # Create the DB tables and unlock the crypto account in parallel, off the event loop
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        loop.run_in_executor(None, db_setup.init_db),
+        loop.run_in_executor(None, crypto_connector.get_account),
+    )
     images.validate_image_envs()
 
     # Ensure the agent's username is stored in the database
-    with db_setup.get_db() as db:
-        agent_user_id = await twitter_pipeline.require_user_id_from_username(db, agent_profile.twitter_handle)
-        db_connector.add_twitter_user(db, user_id=agent_user_id, username=agent_profile.twitter_handle)
+    await twitter_pipeline.require_stored_user_id_from_username(agent_profile.twitter_handle)
 
     return agent_profile
 
@@ -77,12 +94,11 @@ async def setup_app() -> AgentProfile:
     """
     agent_profile = profiles.get_agent_profile()
 
-    db_setup.init_db()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, db_setup.init_db)
 
     # Ensure the agent's username is stored in the database
-    with db_setup.get_db() as db:
-        agent_user_id = await twitter_pipeline.require_user_id_from_username(db, agent_profile.twitter_handle)
-        db_connector.add_twitter_user(db, user_id=agent_user_id, username=agent_profile.twitter_handle)
+    await twitter_pipeline.require_stored_user_id_from_username(agent_profile.twitter_handle)
 
     return agent_profile
 
@@ -96,7 +112,7 @@ async def run_twitter_flow(login: bool):
     agent_profile = await setup_legacy_app()
 
     if login:
-        twitter_browser.login_to_twitter()
+        await asyncio.get_running_loop().run_in_executor(None, twitter_browser.login_to_twitter)
 
     individual_telegram_chat_id = int(get_env_or_raise(envs.TELEGRAM_INDIVIDUAL_CHAT_ID))
     await full_agent.twitter_flow(agent_profile.twitter_handle, individual_telegram_chat_id)
@@ -115,7 +131,7 @@ async def run_telegram_flow():
     except (KeyboardInterrupt, asyncio.CancelledError):
         pass
     finally:
-        await app.stop()
+        await telegram_client.stop_telegram_listener(app)
 
 
 async def subtweet(tweet_topic: str, dry_run: bool = False) -> tuple[str, int | None]:
@@ -161,43 +177,19 @@ async def start_twitter_reply_guy(
     agent_profile = await setup_app()
 
     # Get the current time in RFC 3339
-    current_time = datetime.now()
-    lagged_time = datetime.now() + timedelta(seconds=30)  # offset from mention job
     current_time_string = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")  # used as twitter search filter
 
-    # If an "only" flow is configured, start that job right away
-    # Otherwise lag the followers job
-    mentions_start_time = current_time
-    followers_start_time = current_time if followers_only else lagged_time
-
-    # Create a new scheduler to run the reply flows
-    scheduler = AsyncIOScheduler()
-
-    # Add the mentions job (if applicable)
-    if not followers_only:
-        scheduler.add_job(
-            twitter_workflows.run_reply_guy_mentions_cycle,
-            args=[agent_profile, current_time_string],
-            trigger=IntervalTrigger(minutes=REPLY_GUY_LOOP_FREQUENCY),
-            max_instances=1,
-            coalesce=True,
-            misfire_grace_time=None,
-            name="reply-guy-mentions",
-            next_run_time=mentions_start_time,
-        )
-
-    # Add the mentions job (if applicable)
-    if not mentions_only:
-        scheduler.add_job(
-            twitter_workflows.run_reply_guy_followers_cycle,
-            args=[agent_profile, current_time_string],
-            trigger=IntervalTrigger(minutes=REPLY_GUY_LOOP_FREQUENCY),
-            max_instances=1,
-            coalesce=True,
-            misfire_grace_time=None,
-            name="reply-guy-followers",
-            next_run_time=followers_start_time,
-        )
+    # Schedule the reply flows
+    # The mentions and followers flows share a single job so each tick wakes up once
+    # (the followers cycle is offset within the job, and a slow cycle delays the next tick of both)
+    scheduler = get_scheduler()
+    scheduler.add_job(
+        twitter_workflows.run_reply_guy_cycle,
+        args=[agent_profile, current_time_string, mentions_only, followers_only],
+        trigger=IntervalTrigger(minutes=REPLY_GUY_LOOP_FREQUENCY),
+        name="reply-guy",
+        next_run_time=datetime.now(),
+    )
 
     # Start the scheduler and wait cleanup gracefully during interruption
     scheduler.start()
@@ -227,21 +219,18 @@ async def start_bot(login: bool):
     """
     # Login to twitter if specified
     if login:
-        twitter_browser.login_to_twitter()
+        await asyncio.get_running_loop().run_in_executor(None, twitter_browser.login_to_twitter)
 
     # Initialize database and accounts
     agent_profile = await setup_legacy_app()
     individual_telegram_chat_id = int(get_env_or_raise(envs.TELEGRAM_INDIVIDUAL_CHAT_ID))
 
     # Kick off the background scheduler to create tweets
-    scheduler = AsyncIOScheduler()
+    scheduler = get_scheduler()
     scheduler.add_job(
         full_agent.twitter_flow,
         args=[agent_profile.twitter_handle, individual_telegram_chat_id],
         trigger=IntervalTrigger(minutes=TWITTER_FLOW_LOOP_FREQUENCY),
-        max_instances=1,
-        coalesce=True,
-        misfire_grace_time=None,
         name="twitter-flow",
     )
     scheduler.start()
@@ -256,7 +245,7 @@ async def start_bot(login: bool):
     except (KeyboardInterrupt, asyncio.CancelledError):
         pass
     finally:
-        await app.stop()
+        await telegram_client.stop_telegram_listener(app)
         scheduler.shutdown()
 
 
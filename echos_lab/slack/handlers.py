@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 from slack_bolt.context.say.async_say import AsyncSay
 from sqlalchemy.orm import Session
@@ -10,6 +11,18 @@ from echos_lab.slack.types import SlackHandler, SlackMessage
 from echos_lab.twitter import twitter_workflows
 
 
+@lru_cache(maxsize=None)
+def get_reply_command_regex(agent_name: str) -> re.Pattern:
+    """Returns the compiled regex for the `reply` command, cached per agent name"""
+    return re.compile(rf"^!{re.escape(agent_name)} reply <(https://x\.com/[a-zA-Z0-9_]+/status/(\d+))>")
+
+
+@lru_cache(maxsize=None)
+def get_subtweet_command_regex(agent_name: str) -> re.Pattern:
+    """Returns the compiled regex for the `subtweet` command, cached per agent name"""
+    return re.compile(rf"^!{re.escape(agent_name)} subtweet( --dry-run |\s)(.*)")
+
+
 async def _reply_to_tweet_callback(db: Session, message: SlackMessage, say: AsyncSay):
     """
     Callback handler for replying forcing a reply to a tweet
@@ -22,18 +35,14 @@ async def _reply_to_tweet_callback(db: Session, message: SlackMessage, say: Asyn
     help_command = "```\n!{agent-name} reply {tweet-link}\nEx: !vito reply https://x.com/someuser/status/12345\n```\n"
 
     # Confirm the message was sent with a valid format
-    pattern = re.compile(rf"^!{agent_name} reply <https://x\.com/[a-zA-Z0-9_]+/status/(\d+)>")
-    match = re.match(pattern, message.text)
+    match = get_reply_command_regex(agent_name).match(message.text)
     if match is None:
         response = f"Invalid `reply` command, should be format:\n{help_command}"
         await say(response, thread_ts=message.id)
         return
 
-    # Extract the agent name and tweet ID
-    (tweet_id,) = match.groups()  # type: ignore
-
-    # Grab link from back half of message
-    tweet_link = message.text.split(" ")[-1].replace("<", "").replace(">", "")
+    # Extract the tweet link and ID
+    tweet_link, tweet_id = match.groups()
     logger.info(f"Forcing twitter reply to {tweet_link} from slack")
 
     # Generate the reply
@@ -73,8 +82,7 @@ async def _subtweet_callback(db: Session, message: SlackMessage, say: AsyncSay):
     )
 
     # Confirm the message was sent with a valid format
-    pattern = re.compile(rf"^!{agent_name} subtweet( --dry-run |\s)(.*)")
-    match = re.match(pattern, message.text)
+    match = get_subtweet_command_regex(agent_name).match(message.text)
     if match is None:
         response = f"Invalid `subtweet` command, should be format:\n{help_command}"
         await say(response, thread_ts=message.id)
@@ -1,28 +1,60 @@
+import asyncio
 import datetime
 import re
 import traceback
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Awaitable, Callable
 
-from cachetools import TTLCache
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.context.say.async_say import AsyncSay
 from sqlalchemy.orm import Session
 
+from echos_lab.common.logger import logger
 from echos_lab.db import db_setup
 from echos_lab.engines import profiles
 
+# Max number of slack commands that can be processed at once
+MAX_CONCURRENT_HANDLERS = 10
+
+# Number of stack frames (from the innermost) to include in a failure message posted to slack
+MAX_TRACEBACK_FRAMES = 8
+
+# Cache of recently seen messages (shared across handlers) to prevent dupes
+# Without this, slack will try to reprocess the same message multiple times
+MAX_SEEN_MESSAGES = 4096
+_seen_messages: OrderedDict[str, None] = OrderedDict()
+
+
+def mark_message_seen(cache_key: str) -> bool:
+    """
+    Records the message as seen, evicting the oldest message once the cache is full
+    Returns False if the message was already seen
+    """
+    if cache_key in _seen_messages:
+        return False
+
+    _seen_messages[cache_key] = None
+    if len(_seen_messages) > MAX_SEEN_MESSAGES:
+        _seen_messages.popitem(last=False)
+    return True
+
 
 @dataclass
 class SlackMessage:
     id: str
-    timestamp: datetime.datetime
     timestamp_id: str
     channel: str
     sender: str
     text: str
     thread_ts: str | None
 
+    @cached_property
+    def timestamp(self) -> datetime.datetime:
+        """Parsed lazily since most handlers never need it"""
+        return datetime.datetime.fromtimestamp(float(self.timestamp_id))
+
     @property
     def cache_key(self) -> str:
         return f"{self.channel}:{self.id}"
@@ -31,7 +63,6 @@ class SlackMessage:
     def from_dict(cls, message: dict) -> "SlackMessage":
         return cls(
             id=message["ts"],
-            timestamp=datetime.datetime.fromtimestamp(float(message["ts"])),
             timestamp_id=message["ts"],
             channel=message["channel"],
             sender=message["user"],
@@ -49,9 +80,23 @@ class SlackHandler:
     # The callback function when the command is invoked
     handler: Callable[[Session, SlackMessage, AsyncSay], Awaitable[None]]
 
-    # Local cache of seen messages to prevent dupe
-    # Without this, slack will try to reprocess the same message multiple times
-    _message_cache: TTLCache = field(default_factory=lambda: TTLCache(maxsize=1000, ttl=300))
+    # Bounds the number of commands processed in the background at once
+    # and holds a reference to each task so it isn't garbage collected before it finishes
+    _semaphore: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(MAX_CONCURRENT_HANDLERS))
+    _tasks: set[asyncio.Task] = field(default_factory=set)
+
+    async def _run_handler(self, slack_message: SlackMessage, say: AsyncSay):
+        """
+        Calls the user-specified handler, posting the traceback to the thread if it fails
+        """
+        async with self._semaphore:
+            try:
+                with db_setup.get_db() as db:
+                    await self.handler(db, slack_message, say)
+            except Exception as e:
+                logger.exception(f"Slack handler {self.name} failed")
+                error = "".join(traceback.format_exception(e, limit=-MAX_TRACEBACK_FRAMES))
+                await say(f"Failed to post tweet:\n```\n{error}\n```\n", thread_ts=slack_message.id)
 
     def register_handler(self, app: AsyncApp, channel_id: str):
         """
@@ -73,20 +118,18 @@ class SlackHandler:
             and calls the business logic in the callback
             When the decorator (@app.message) is evaluated, the handler is registered
             """
-            slack_message = SlackMessage.from_dict(message)
-
             # Ignore messages that not in the specified channel
-            if slack_message.channel != channel_id:
+            if message.get("channel") != channel_id:
                 return
 
+            slack_message = SlackMessage.from_dict(message)
+
             # Ignore messages that were already processed
-            if self._message_cache.get(slack_message.cache_key) is not None:
+            if not mark_message_seen(slack_message.cache_key):
                 return
-            self._message_cache[slack_message.cache_key] = True
 
-            # Call the user-specified handler
-            try:
-                with db_setup.get_db() as db:
-                    await self.handler(db, slack_message, say)
-            except Exception:
-                await say(f"Failed to post tweet:\n```\n{traceback.format_exc()}\n```\n", thread_ts=slack_message.id)
+            # Call the user-specified handler in the background so that the listener
+            # can ack this message and pick up the next one while the command runs
+            task = asyncio.create_task(self._run_handler(slack_message, say))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
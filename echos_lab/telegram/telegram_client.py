@@ -1,9 +1,10 @@
+import asyncio
 import os
 import re
-import traceback
-from functools import partial
-from typing import List
+from functools import lru_cache, partial
+from typing import List, Sequence
 
+from sqlalchemy import Row
 from telegram import Update
 from telegram.ext import Application, CallbackContext, ExtBot, MessageHandler, filters
 
@@ -19,45 +20,105 @@ QUOTE_TWEET_MARKER = "QUOTE TWEET"
 REPLY_TWEET_MARKER = "REPLY TO"
 TWEET_MARKER = "TWEET"
 
+# Matches either of the markers for a message that starts with a header linking the original tweet
+HEADER_MARKER_REGEX = re.compile(f"{re.escape(QUOTE_TWEET_MARKER)}|{re.escape(REPLY_TWEET_MARKER)}")
 
-# Module level singleton to store the telegram app
+# Messages starting with this prefix (case-insensitive) are ignored by the bot
+IGNORE_MESSAGE_PREFIX = "ignorethis"
+
+# Matches markdown characters that aren't part of a "[TWEET](...)" link
+MARKDOWN_ESCAPE_REGEX = re.compile(r'(?<!\[TWEET\]\()([_*[\]`])(?!.*\))')
+MARKDOWN_ESCAPE_TABLE = str.maketrans({char: f"\\{char}" for char in "_*[]`"})
+
+# Tweet links in sent messages, and a regex to pull out the tweet ID from one
+TWEET_LINK_PREFIX = "https://twitter.com/"
+TWEET_LINK_ID_REGEX = re.compile(r'https://twitter\.com/[^/]+/[^/]+/([^/)]+)')
+
+
+# Max number of telegram updates (e.g. messages) that can be handled at once
+# This lets new messages be picked up while the agent is still responding to an earlier one
+MAX_CONCURRENT_UPDATES = 4
+
+# Module level singletons to store the telegram app, the bot's individual chat ID and its username
 _app: Application | None = None
+_individual_chat_id: int | None = None
+_bot_username: str | None = None
+
+# Incoming messages are buffered and written to the database in batches
+# The flush lock keeps the batches in order when a flush is forced
+MESSAGE_FLUSH_INTERVAL = 0.5  # seconds
+MESSAGE_BATCH_SIZE = 64
+# Max number of messages kept in the buffer while writes are failing (the oldest are dropped beyond this)
+MAX_PENDING_MESSAGES = MESSAGE_BATCH_SIZE * 16
+_pending_messages: list[tuple[str, str, int]] = []
+_pending_messages_event = asyncio.Event()
+_flush_lock = asyncio.Lock()
+_flush_task: asyncio.Task | None = None
 
 
 def get_telegram_app():
     """
     Singleton to get or create the telegram app
     """
-    telegram_token = get_env_or_raise(envs.TELEGRAM_TOKEN)
     global _app
     if not _app:
-        _app = Application.builder().token(telegram_token).build()
+        telegram_token = get_env_or_raise(envs.TELEGRAM_TOKEN)
+        _app = Application.builder().token(telegram_token).concurrent_updates(MAX_CONCURRENT_UPDATES).build()
     return _app
 
 
+def get_individual_chat_id() -> int:
+    """
+    Singleton to get the bot's individual chat ID from the environment variable
+    """
+    global _individual_chat_id
+    if _individual_chat_id is None:
+        _individual_chat_id = int(get_env_or_raise(envs.TELEGRAM_INDIVIDUAL_CHAT_ID))
+    return _individual_chat_id
+
+
 def escape_markdown(text):
     """
     Escapes special markdown characters in text for telegram messages,
     to prevent messages from showing up as markdown
     """
-    return re.sub(
-        r'(?<!\[TWEET\]\()([_*[\]`])(?!.*\))',  # match markdown characters not in "[TWEET](...)" pattern
-        r'\\\1',
-        text,
-    )
+    return "\n".join(_escape_markdown_line(line) for line in text.split("\n"))
+
+
+def _escape_markdown_line(line: str) -> str:
+    """
+    Escapes a single line of a message (equivalent to MARKDOWN_ESCAPE_REGEX)
+    The regex only escapes characters with no closing parenthesis later in the line,
+    so everything up to the last ")" is left as is and the tail is escaped with str.translate
+    """
+    tail_start = line.rfind(")") + 1
+    tail = line[tail_start:]
+
+    # Fall back to the regex for the rare case where a tweet link opens after the last parenthesis
+    if "[TWEET](" in tail:
+        return MARKDOWN_ESCAPE_REGEX.sub(r'\\\1', line)
+
+    return line[:tail_start] + tail.translate(MARKDOWN_ESCAPE_TABLE)
 
 
 async def get_bot_username(bot: ExtBot) -> str:
     """
     Gets the telegram bot username by checking the info
+    The username is cached after the first lookup since it can't change while the bot is running
     Errors if not found
     """
+    global _bot_username
+    if _bot_username is not None:
+        return _bot_username
+
     bot_info = await bot.get_me()
     if not bot_info:
         raise ValueError(f"Bot info not found for {bot}!")
     if not bot_info.username:
         raise ValueError(f"Bot username not found for {bot}!")
-    return bot_info.username
+
+    _bot_username = bot_info.username
+    return _bot_username
 
 
 def get_posted_tweet_message(agent_username: str, tweet_id: int | None, tweet_text: str) -> str:
@@ -166,11 +227,13 @@ def validate_message_update(update: Update, target_chat_id: int) -> str | None:
     if not update.message:
         return None
 
-    logger.debug(f"Update: {update}")
-    logger.debug(f"New message: {update.message.text}\n\n{update.message}")
+    # Use lazy formatting since the full update is expensive to stringify and debug logs are usually disabled
+    logger.debug("Update: %s", update)
+    logger.debug("New message: %s\n\n%s", update.message.text, update.message)
 
+    # Only the start of the message is lowercased, since that's all that's needed for the prefix check
     message_text = update.message.text
-    if message_text.lower().strip().startswith("ignorethis"):  # type: ignore
+    if message_text.lstrip()[: len(IGNORE_MESSAGE_PREFIX)].lower() == IGNORE_MESSAGE_PREFIX:  # type: ignore
         return None
 
     return message_text
@@ -184,12 +247,103 @@ def get_telegram_messages(target_chat_id: int, num_messages: int = 30) -> list[m
         return list(db_connector.get_telegram_messages(db, target_chat_id, num_messages))
 
 
-def save_telegram_messages(username: str, message_contents: str, chat_id: int):
+def get_telegram_message_history(target_chat_id: int, num_messages: int = 30) -> Sequence[Row[tuple[str, str]]]:
     """
-    Saves sent telegram messages to the database
+    Reads the sender and content of recent telegram messages from the database, most recent first
     """
     with db_setup.get_db() as db:
-        db_connector.add_telegram_message(db, username, message_contents, chat_id)
+        return db_connector.get_telegram_message_history(db, target_chat_id, num_messages)
+
+
+def _save_telegram_message_batch(messages: list[tuple[str, str, int]]):
+    """
+    Blocking write of a batch of telegram messages to the database
+    """
+    with db_setup.get_db() as db:
+        db_connector.add_telegram_messages(db, messages)
+
+
+async def flush_telegram_messages():
+    """
+    Writes all buffered telegram messages to the database in a single batch
+    """
+    async with _flush_lock:
+        batch = _pending_messages.copy()
+        _pending_messages.clear()
+        _pending_messages_event.clear()
+        if not batch:
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, partial(_save_telegram_message_batch, batch))
+        except Exception:
+            # Put the batch back at the front of the buffer so it's retried on the next flush
+            _pending_messages[:0] = batch
+            _pending_messages_event.set()
+
+            num_dropped = len(_pending_messages) - MAX_PENDING_MESSAGES
+            if num_dropped > 0:
+                logger.warning(f"Telegram message buffer is full, dropping the {num_dropped} oldest messages")
+                del _pending_messages[:num_dropped]
+            raise
+
+
+async def buffer_telegram_message(username: str, message_contents: str, chat_id: int):
+    """
+    Buffers a telegram message to be saved in the next batch
+    The batch is written right away once it's full, otherwise the background flusher will pick it up
+    """
+    _pending_messages.append((username, message_contents, chat_id))
+    _pending_messages_event.set()
+    if len(_pending_messages) >= MESSAGE_BATCH_SIZE:
+        await flush_telegram_messages()
+
+
+async def run_message_flusher():
+    """
+    Background task that waits for buffered messages and then flushes them after a short delay,
+    so that a burst of messages gets written together
+    """
+    try:
+        while True:
+            await _pending_messages_event.wait()
+            await asyncio.sleep(MESSAGE_FLUSH_INTERVAL)
+            try:
+                await flush_telegram_messages()
+            except Exception as e:
+                logger.error(f"Failed to save telegram messages: {e}")
+    finally:
+        # Save anything that's still buffered on shutdown
+        try:
+            await flush_telegram_messages()
+        except Exception:
+            logger.exception("Failed to save buffered telegram messages on shutdown")
+
+
+async def stop_message_flusher():
+    """
+    Cancels the background flusher task, which saves anything still buffered before it exits
+    """
+    global _flush_task
+    if _flush_task is None:
+        return
+
+    _flush_task.cancel()
+    try:
+        await _flush_task
+    except asyncio.CancelledError:
+        pass
+    _flush_task = None
+
+
+async def save_telegram_messages(username: str, message_contents: str, chat_id: int):
+    """
+    Saves sent telegram messages to the database
+    The message goes through the buffer so that it's written after any messages received before it
+    """
+    await buffer_telegram_message(username, message_contents, chat_id)
+    await flush_telegram_messages()
 
 
 def get_interacted_tweets() -> List[str]:
@@ -197,23 +351,21 @@ def get_interacted_tweets() -> List[str]:
     Gets a list of all the tweets that the bot has already interacted with
     This is to prevent re-engaging with the same tweet
     """
-    # Gets the most recent 200 TG messages
-    individual_chat_id = int(get_env_or_raise(envs.TELEGRAM_INDIVIDUAL_CHAT_ID))
-    most_recent_messages_raw = get_telegram_messages(individual_chat_id, 200)
-
-    # filter only to messages where msg.user_id == "You"
-    most_recent_messages = [msg.content for msg in most_recent_messages_raw if msg.user_id == "You"]
+    # Gets the most recent 200 TG messages from the bot that contain a tweet link
+    individual_chat_id = get_individual_chat_id()
+    with db_setup.get_db() as db:
+        messages = db_connector.get_telegram_message_contents_containing(
+            db,
+            chat_id=individual_chat_id,
+            username="You",
+            substring=TWEET_LINK_PREFIX,
+            history=200,
+        )
 
     # Build a list of all the tweets IDs that were interacted with already
-    interacted_tweets = []
-    for message in most_recent_messages:
-        if "https://twitter.com/" in message:
-            try:
-                tweet_id = message.split("https://twitter.com/")[1].split("/")[2].split(")")[0]
-                interacted_tweets.append(tweet_id)
-            except Exception:
-                continue
-    return list(set(interacted_tweets))
+    matches = (TWEET_LINK_ID_REGEX.search(message) for message in messages)
+    interacted_tweets = {match.group(1) for match in matches if match}
+    return list(interacted_tweets)
 
 
 async def send_message(msg_contents: str, chat_id: int):
@@ -227,14 +379,14 @@ async def send_message(msg_contents: str, chat_id: int):
     msg_contents = msg_contents.replace("@", "")
     logger.info(f"Sending message: {msg_contents}, to chat_id: {chat_id}, with parse_mode: {PARSE_MODE}")
 
-    if (QUOTE_TWEET_MARKER in msg_contents) or (REPLY_TWEET_MARKER in msg_contents):
+    if HEADER_MARKER_REGEX.search(msg_contents):
         first_line, rest = msg_contents.split("\n", 1)
         rest = escape_markdown(rest)
         msg_contents = f"{first_line}\n{rest}"
     else:
         msg_contents = escape_markdown(msg_contents)
 
-    save_telegram_messages("You", msg_contents, chat_id)
+    await save_telegram_messages("You", msg_contents, chat_id)
 
     await app.bot.send_message(
         chat_id=chat_id,
@@ -260,18 +412,27 @@ async def individual_chat_message_handler(
         return
 
     try:
-        # add message to history
+        # add message to history and send typing symbol
+        # these are independent, so the typing symbol shows up while the message is being saved
         username = get_username_from_update(update)
-        save_telegram_messages(username, message_text, individual_chat_id)
-
-        # send typing symbol
-        await context.bot.send_chat_action(chat_id=individual_chat_id, action="typing")
+        await asyncio.gather(
+            save_telegram_messages(username, message_text, individual_chat_id),
+            context.bot.send_chat_action(chat_id=individual_chat_id, action="typing"),
+        )
 
         # generate a new response
         await full_agent.respond_in_telegram_individual_flow(username, message_text, individual_chat_id)
 
     except Exception:
-        traceback.print_exc()
+        logger.exception("Failed to handle telegram message")
+
+
+@lru_cache(maxsize=4)
+def get_bot_name_regex(bot_name: str) -> re.Pattern:
+    """
+    Returns a case-insensitive regex that matches the bot's name as a standalone word
+    """
+    return re.compile(rf"(?<![a-z0-9]){re.escape(bot_name)}(?![a-z0-9])", re.IGNORECASE)
 
 
 def should_respond_to_groupchat_message(bot_name: str, message_text: str) -> bool:
@@ -280,9 +441,7 @@ def should_respond_to_groupchat_message(bot_name: str, message_text: str) -> boo
 
     Currently, the bot will respond if the previous message contains the bot's name.
     """
-    # filter to alphanumeric characters, without regex
-    alphanum_message = "".join([c for c in message_text.lower() if c.isalnum()]).split()
-    return bot_name.lower() in alphanum_message
+    return get_bot_name_regex(bot_name).search(message_text) is not None
 
 
 async def group_chat_message_handler(
@@ -301,21 +460,44 @@ async def group_chat_message_handler(
 
     try:
         # add message to history
+        # if we're not going to respond, it can be saved with the next batch,
+        # otherwise, flush it right away so it's in the history the agent reads
         username = get_username_from_update(update)
-        save_telegram_messages(username, message_text, group_chat_id)
+        await buffer_telegram_message(username, message_text, group_chat_id)
 
         # evaluate if we should respond
         if not should_respond_to_groupchat_message(bot_name, message_text):
             return
 
-        # send typing symbol
-        await context.bot.send_chat_action(chat_id=group_chat_id, action="typing")
+        # send typing symbol while the history is flushed
+        await asyncio.gather(
+            flush_telegram_messages(),
+            context.bot.send_chat_action(chat_id=group_chat_id, action="typing"),
+        )
 
         # generate a new response
         await full_agent.respond_in_telegram_groupchat_flow(username, message_text, group_chat_id=group_chat_id)
 
     except Exception:
-        traceback.print_exc()
+        logger.exception("Failed to handle telegram message")
+
+
+async def chat_message_handler(
+    bot_name: str,
+    individual_chat_id: int,
+    group_chat_id: int | None,
+    update: Update,
+    context: CallbackContext,
+):
+    """
+    Single entrypoint for text messages from any of the listened to chats,
+    which routes the update to the individual or group chat handler based on the chat ID
+    """
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    if chat_id == individual_chat_id:
+        await individual_chat_message_handler(individual_chat_id, update, context)
+    elif group_chat_id and chat_id == group_chat_id:
+        await group_chat_message_handler(bot_name, group_chat_id, update, context)
 
 
 async def start_telegram_listener() -> Application:
@@ -333,20 +515,24 @@ async def start_telegram_listener() -> Application:
 
     # Create a new telegram listening app
     app = get_telegram_app()
-    individual_chat_id = int(get_env_or_raise(envs.TELEGRAM_INDIVIDUAL_CHAT_ID))
+    individual_chat_id = get_individual_chat_id()
     group_chat_id = int(os.environ[envs.TELEGRAM_GROUP_CHAT_ID]) if envs.TELEGRAM_GROUP_CHAT_ID in os.environ else None
 
-    # Listen to messages in the target chat
-    in_individual_chat = filters.TEXT & filters.Chat(individual_chat_id)
-    individual_chat_handler = partial(individual_chat_message_handler, individual_chat_id)
-    app.add_handler(MessageHandler(in_individual_chat, individual_chat_handler))
-
-    # If configured, listen to messages in the group chat
+    # Listen to messages in the target chat, and, if configured, the group chat
+    # Both go through one handler so each update is only run through a single filter chain
+    chat_ids = [individual_chat_id]
     if group_chat_id:
         logger.info(f"LISTENING TO GROUPCHAT: {group_chat_id}")
-        in_group_chat = filters.TEXT & filters.Chat(group_chat_id)
-        group_chat_handler = partial(group_chat_message_handler, bot_name, group_chat_id)
-        app.add_handler(MessageHandler(in_group_chat, group_chat_handler))
+        chat_ids.append(group_chat_id)
+
+    in_listened_chats = filters.TEXT & filters.Chat(chat_ids)
+    chat_handler = partial(chat_message_handler, bot_name, individual_chat_id, group_chat_id)
+    app.add_handler(MessageHandler(in_listened_chats, chat_handler))
+
+    # Start the background task that saves incoming messages in batches
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(run_message_flusher())
 
     # Initailize the listener app
     await app.initialize()
@@ -355,3 +541,12 @@ async def start_telegram_listener() -> Application:
     # Start polling for new messages (that match the above handlers)
     await app.updater.start_polling(allowed_updates=Update.ALL_TYPES)  # type: ignore
     return app
+
+
+async def stop_telegram_listener(app: Application):
+    """
+    Stops the telegram app and then the message flusher, so that any messages
+    received before the app stopped are still saved
+    """
+    await app.stop()
+    await stop_message_flusher()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 # Silence Telethon's libssl info log
@@ -15,6 +16,73 @@ from echos_lab.common.env import get_env_or_raise  # noqa: E402
 from echos_lab.common.logger import logger  # noqa: E402
 from echos_lab.telegram import telegram_client  # noqa: E402
 
+# Megagroup chat IDs in the bot API are the channel ID prefixed with -100
+MEGAGROUP_CHAT_ID_OFFSET = 1_000_000_000_000
+
+# Module level singleton to store the telethon client, so the session
+# and connection can be reused across group creations
+_telethon_client: TelegramClient | None = None
+
+# Lock to ensure concurrent callers don't each try to start (and log in) the shared client
+_telethon_connect_lock = asyncio.Lock()
+
+
+def get_telethon_client() -> TelegramClient:
+    """
+    Singleton to get or create the telethon client
+    """
+    global _telethon_client
+    if _telethon_client is None:
+        api_id = int(get_env_or_raise(envs.TELEGRAM_API_ID))
+        api_hash = get_env_or_raise(envs.TELEGRAM_API_HASH)
+        _telethon_client = TelegramClient("create_chat_session", api_id=api_id, api_hash=api_hash)
+    return _telethon_client
+
+
+async def connect_telethon_client() -> TelegramClient:
+    """
+    Returns the telethon client, only starting it (and logging in) if it's not already connected
+    """
+    telethon_client = get_telethon_client()
+    async with _telethon_connect_lock:
+        if not telethon_client.is_connected():
+            await telethon_client.start()  # type: ignore
+    return telethon_client
+
+
+async def disconnect_telethon_client():
+    """
+    Disconnects the telethon client if it was connected, should be called on shutdown
+    """
+    if _telethon_client is not None and _telethon_client.is_connected():
+        await _telethon_client.disconnect()  # type: ignore
+
+
+async def add_admin(telethon_client: TelegramClient, channel_id: int, user_id: str):
+    """
+    Adds a user to the channel as an admin, logging (rather than raising) on failure
+    """
+    try:
+        await telethon_client.edit_admin(
+            channel_id,
+            user_id,
+            is_admin=True,
+            title="Admin",
+            add_admins=True,
+            invite_users=True,
+            change_info=True,
+            post_messages=True,
+            edit_messages=True,
+            delete_messages=True,
+            ban_users=True,
+            pin_messages=True,
+            manage_call=True,
+            anonymous=False,
+        )
+        logger.info(f"User {user_id} added as admin.")
+    except Exception as e:
+        logger.error(f"Failed to add {user_id} as admin: {e}")
+
 
 async def create_group_with_admins(
     telethon_client: TelegramClient,
@@ -35,27 +103,8 @@ async def create_group_with_admins(
     logger.info(f"Megagroup '{group_name}' created successfully!")
 
     # Step 2: Add users to the channel (since we can't add them during creation)
-    for user_id in user_ids:
-        try:
-            await telethon_client.edit_admin(
-                channel_id,
-                user_id,
-                is_admin=True,
-                title="Admin",
-                add_admins=True,
-                invite_users=True,
-                change_info=True,
-                post_messages=True,
-                edit_messages=True,
-                delete_messages=True,
-                ban_users=True,
-                pin_messages=True,
-                manage_call=True,
-                anonymous=False,
-            )
-            logger.info(f"User {user_id} added as admin.")
-        except Exception as e:
-            logger.error(f"Failed to add {user_id} as admin: {e}")
+    # Telethon multiplexes requests on the same connection, so these can all be sent at once
+    await asyncio.gather(*(add_admin(telethon_client, channel_id, user_id) for user_id in user_ids))
 
     # Set default permissions (optional, adjust as needed)
     default_rights = ChatBannedRights(
@@ -77,7 +126,7 @@ async def create_group_with_admins(
     logger.info("Group permissions set successfully!")
 
     # add -100 because this is a megagroup
-    return int("-100" + str(channel_id))
+    return -MEGAGROUP_CHAT_ID_OFFSET - channel_id
 
 
 async def create_test_group():
@@ -89,24 +138,23 @@ async def create_test_group():
     # Create telegram app
     app = telegram_client.get_telegram_app()
     admin_username = get_env_or_raise(envs.TELEGRAM_ADMIN_HANDLE)
-    bot_username = await telegram_client.get_bot_username(app.bot)
     bot_name = get_env_or_raise(envs.LEGACY_AGENT_NAME).capitalize()
 
-    # Create and start telethon client (since )
-    api_id = int(get_env_or_raise(envs.TELEGRAM_API_ID))
-    api_hash = get_env_or_raise(envs.TELEGRAM_API_HASH)
-    telethon_client = TelegramClient("create_chat_session", api_id=api_id, api_hash=api_hash)
-    telethon_client.start()
+    # Lookup the bot username while getting the telethon client (since bots can't create groups),
+    # connecting it if this is the first use - the two are independent so they can overlap
+    bot_username, telethon_client = await asyncio.gather(
+        telegram_client.get_bot_username(app.bot),
+        connect_telethon_client(),
+    )
 
     usernames = [admin_username, bot_username]
     description = f"Chat with {bot_name} - an Echo"
 
-    async with telethon_client:
-        chat_id = await create_group_with_admins(
-            telethon_client,
-            bot_name + " - Echo",
-            description,
-            usernames,
-        )
+    chat_id = await create_group_with_admins(
+        telethon_client,
+        bot_name + " - Echo",
+        description,
+        usernames,
+    )
 
     logger.info(f"Created group with chat_id: {chat_id}")
@@ -5,8 +5,8 @@ from pathlib import Path
 from typing import cast
 
 from echos_lab.engines import post_maker, profiles, prompts
-from echos_lab.engines.post_maker import TweetEvaluation
 from echos_lab.engines.profiles import AgentProfile
+from echos_lab.engines.prompts import TweetEvaluation
 from echos_lab.twitter import twitter_client
 from echos_lab.twitter.types import HydratedTweet, MentionType, TweetMention
 
@@ -49,16 +49,16 @@ def get_prompt_source_code(agent_profile: AgentProfile) -> str:
     This is so we can keep track of which prompt was used without
     actually evaluation the prompt (and thus reducing the output size)
     """
-    prompt_function = "get_reply_guy_prompt"
+    prompt_function = "build_reply_guy_prompt"
 
     # Read prompts.py
     with open(PROMPTS_PY_FILE, "r") as f:
         lines = f.readlines()
 
     # Get the start and end index of the function
-    # NOTE: This assumes the function ends with a line that starts with "return PromptTemplate"
+    # NOTE: This assumes the function ends with a line that starts with "return ChatPromptTemplate"
     start_index = next(i for i, line in enumerate(lines) if f"def {prompt_function}" in line)
-    end_index = next(i for i, line in enumerate(lines) if i > start_index and "return PromptTemplate" in line)
+    end_index = next(i for i, line in enumerate(lines) if i > start_index and "return ChatPromptTemplate" in line)
     assert start_index and end_index, "Function or return statement not found"
 
     # Get the full text string of the function
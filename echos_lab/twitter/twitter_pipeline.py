@@ -3,7 +3,7 @@ from typing import List
 from sqlalchemy.orm import Session
 
 from echos_lab.common.logger import logger
-from echos_lab.db import db_connector, models
+from echos_lab.db import db_connector, db_setup, models
 from echos_lab.db.models import QueryType, TwitterQueryCheckpoint, TwitterUser
 from echos_lab.twitter import twitter_client, twitter_helpers
 from echos_lab.twitter.types import FollowerTweet, TweetExclusions, TweetMention
@@ -179,6 +179,26 @@ async def require_user_id_from_username(db: Session, username: str) -> int:
     return user_id
 
 
+async def require_stored_user_id_from_username(username: str) -> int:
+    """
+    Same as require_user_id_from_username, but opens its own short DB sessions around
+    the twitter API call, so that a connection isn't held open during the network request
+    This is useful at startup when storing the agent's user before any session is open
+    """
+    with db_setup.get_db() as db:
+        user = db_connector.get_twitter_user(db, username=username)
+    if user:
+        return user.user_id
+
+    user_id = await twitter_client.get_user_id_from_username(username)
+    if not user_id:
+        raise RuntimeError(f"Twitter User ID not found for handle @{username}")
+
+    with db_setup.get_db() as db:
+        db_connector.add_twitter_user(db, user_id=user_id, username=username)
+    return user_id
+
+
 async def require_username_from_user_id(db: Session, user_id: int) -> str:
     """
     Fetches the username from the user ID and raises an exception if not found
@@ -407,12 +407,9 @@ async def reply_to_followers(agent_profile: AgentProfile, tweets: list[FollowerT
     """
     Generates and posts a reply guy response to all tweets in the list
     """
-    # Build a mapping from username -> reply probability
-    reply_probability_mapping = {follower.username: follower.reply_probability for follower in agent_profile.followers}
-
     # Loop through each tweet and generate a response
     for tweet in tweets:
-        if random.random() > reply_probability_mapping[tweet.username]:
+        if random.random() > agent_profile.get_reply_probability(tweet.username):
             logger.info(f"Randomly skipping tweet from {tweet.username} to prevent spam")
             continue
 
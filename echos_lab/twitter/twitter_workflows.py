@@ -1,3 +1,4 @@
+import asyncio
 from typing import cast
 
 from sqlalchemy.orm import Session
@@ -13,6 +14,9 @@ from echos_lab.twitter.types import (
     HydratedTweet,
 )
 
+# Delay between the start of the mentions and followers cycles, when both are run
+FOLLOWERS_CYCLE_OFFSET_SECONDS = 30
+
 
 @with_db
 async def run_reply_guy_mentions_cycle(db: Session, agent_profile: AgentProfile, bot_start_time: str):
@@ -79,6 +83,44 @@ async def run_reply_guy_followers_cycle(db: Session, agent_profile: AgentProfile
     await twitter_poster.reply_to_followers(agent_profile=agent_profile, tweets=tweets)
 
 
+async def run_reply_guy_cycle(
+    agent_profile: AgentProfile,
+    bot_start_time: str,
+    mentions_only: bool = False,
+    followers_only: bool = False,
+):
+    """
+    Main runner for an iteration of the reply guy flow which runs the mentions
+    and followers cycles together (or just one of them if an "only" flag is set)
+
+    When both run, the followers cycle starts FOLLOWERS_CYCLE_OFFSET_SECONDS after the mentions
+    cycle so the two don't hit twitter at the same moment. Since they share one scheduled job,
+    the iteration only finishes once both cycles are done, so a slow cycle delays the next run of both
+
+    Args:
+        agent_profile: Profile configuration for the reply guy
+        bot_start_time: UTC timestamp when bot was started, used for filtering tweets
+        mentions_only: bool indicating if we should only reply to mentions
+        followers_only: bool indicating if we should only reply to followers
+    """
+
+    async def run_followers_cycle(offset_seconds: int):
+        await asyncio.sleep(offset_seconds)
+        await run_reply_guy_followers_cycle(agent_profile=agent_profile, bot_start_time=bot_start_time)
+
+    cycles = {}
+    if not followers_only:
+        cycles["mentions"] = run_reply_guy_mentions_cycle(agent_profile=agent_profile, bot_start_time=bot_start_time)
+    if not mentions_only:
+        cycles["followers"] = run_followers_cycle(0 if followers_only else FOLLOWERS_CYCLE_OFFSET_SECONDS)
+
+    # Run both flows concurrently, making sure a failure in one does not cancel the other
+    results = await asyncio.gather(*cycles.values(), return_exceptions=True)
+    for name, result in zip(cycles, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Reply guy {name} cycle failed", exc_info=result)
+
+
 async def reply_to_tweet(agent_profile: AgentProfile, tweet_id: int) -> int | None:
     """
     Generates and posts a reply guy response to a specific tweet
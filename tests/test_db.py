@@ -27,6 +27,16 @@ class TestAddGetTelegramMessage:
         assert len(messages) == 1
         assert messages[0].content == "Hello, world!"
 
+    def test_add_telegram_messages(self, db: Session):
+        """Test adding a batch of Telegram messages."""
+        db_connector.add_telegram_messages(db, [("user1", "First", 123), ("user2", "Second", 123)])
+
+        messages = db_connector.get_telegram_messages(db, chat_id=123)
+        assert [(message.user_id, message.content) for message in messages] == [
+            ("user2", "Second"),
+            ("user1", "First"),
+        ]
+
     def test_get_telegram_messages_ordering(self, db: Session):
         """Test message retrieval ordering."""
         # Add messages in non-chronological order
@@ -58,6 +68,31 @@ class TestAddGetTelegramMessage:
         assert len(chat1_msgs) == 1
         assert len(chat2_msgs) == 1
 
+    def test_get_telegram_message_history(self, db: Session):
+        """Test retrieving just the sender and content of recent messages."""
+        msgs = [("user1", "First", 123), ("user2", "Second", 123), ("user1", "Other chat", 456)]
+        for user, content, chat_id in msgs:
+            db_connector.add_telegram_message(db, user, content, chat_id)
+
+        history = db_connector.get_telegram_message_history(db, chat_id=123)
+        assert [(row.user_id, row.content) for row in history] == [("user2", "Second"), ("user1", "First")]
+
+    def test_get_telegram_message_contents_containing(self, db: Session):
+        """Test filtering messages by chat, sender and content."""
+        db_connector.add_telegram_message(db, "You", "TWEETED (https://twitter.com/a/status/1)", 123)
+        db_connector.add_telegram_message(db, "You", "No link here", 123)
+        db_connector.add_telegram_message(db, "user1", "REPLY (https://twitter.com/b/status/2)", 123)
+        db_connector.add_telegram_message(db, "You", "TWEETED (https://twitter.com/c/status/3)", 456)
+        db_connector.add_telegram_message(db, "You", "TWEETED (https://twitter.com/d/status/4)", 123)
+
+        contents = db_connector.get_telegram_message_contents_containing(
+            db, chat_id=123, username="You", substring="https://twitter.com/"
+        )
+        assert list(contents) == [
+            "TWEETED (https://twitter.com/d/status/4)",
+            "TWEETED (https://twitter.com/a/status/1)",
+        ]
+
     def test_large_telegram_chat_id(self, db: Session):
         """Test handling large Telegram chat IDs (negative and positive)."""
         large_negative_id = -1002390254270  # Real Telegram group ID
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from echos_lab.engines import post_maker
+
+TRAINING_TWEET = "the market is looking absolutely wild today, loading up on more eth before the next leg up"
+
+
+@pytest.fixture
+def tweet_data(tmp_path, monkeypatch) -> None:
+    """
+    Points the tweet data at a temporary directory with a single training tweet
+    """
+    with open(tmp_path / "tweets.jsonl", "w") as f:
+        f.write(json.dumps({"text": TRAINING_TWEET}) + "\n")
+        f.write(json.dumps({"text": "gm"}) + "\n")
+
+    monkeypatch.setattr(post_maker, "TWEET_DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(post_maker, "_tweet_data_cache", {})
+
+
+class TestGetMinSharedShingles:
+    def test_get_min_shared_shingles(self):
+        """
+        Tests the shingle bound is only positive when the texts are long enough for it to rule out a match
+        """
+        assert post_maker.get_min_shared_shingles(total_length=4, threshold=85) <= 0
+        assert post_maker.get_min_shared_shingles(total_length=10, threshold=85) > 0
+        assert post_maker.get_min_shared_shingles(total_length=200, threshold=85) > 0
+        assert post_maker.get_min_shared_shingles(total_length=200, threshold=90) > (
+            post_maker.get_min_shared_shingles(total_length=200, threshold=85)
+        )
+
+
+@pytest.mark.usefixtures("tweet_data")
+class TestVerifyTweetDissimilarFromTweetData:
+    def test_dissimilar_tweet(self):
+        """
+        Tests that an unrelated tweet is considered dissimilar
+        """
+        assert post_maker.verify_tweet_dissimilar_from_tweet_data("just deployed a new contract on echos, so excited")
+
+    def test_exact_copy(self):
+        """
+        Tests that a copy of a training tweet, ignoring casing, links and whitespace, is considered similar
+        """
+        copied_tweet = TRAINING_TWEET.upper().replace(" ", "  ") + " https://t.co/abc"
+        assert not post_maker.verify_tweet_dissimilar_from_tweet_data(copied_tweet)
+
+    def test_edited_copy_without_shared_shingles(self):
+        """
+        Tests that a near-duplicate is considered similar even if the edits leave
+        it without any 5-character shingles in common with the training tweet
+        """
+        # Insert a character after every 4th character
+        edited_tweet = "".join(char + ("#" if i % 4 == 3 else "") for i, char in enumerate(TRAINING_TWEET))
+        edited_shingles = {edited_tweet[i : i + 5] for i in range(len(edited_tweet) - 4)}
+        training_shingles = {TRAINING_TWEET[i : i + 5] for i in range(len(TRAINING_TWEET) - 4)}
+        assert not edited_shingles & training_shingles
+
+        assert not post_maker.verify_tweet_dissimilar_from_tweet_data(edited_tweet)
@@ -0,0 +1,84 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from echos_lab.engines import post_retriever
+
+
+def build_notification_data() -> dict:
+    """
+    Builds a notifications payload with a reply to a tweet, where both tweets
+    and their authors are included in the payload's global objects
+    """
+    return {
+        "globalObjects": {
+            "users": {
+                "100": {"screen_name": "userA"},
+                "200": {"screen_name": "userB"},
+            },
+            "tweets": {
+                "1": {
+                    "user_id_str": "100",
+                    "full_text": "original tweet",
+                    "created_at": "Mon Jan 01 00:00:00 +0000 2024",
+                    "in_reply_to_status_id_str": None,
+                },
+                "2": {
+                    "user_id_str": "200",
+                    "full_text": "reply tweet",
+                    "created_at": "Mon Jan 01 00:01:00 +0000 2024",
+                    "in_reply_to_status_id_str": "1",
+                },
+            },
+        }
+    }
+
+
+@pytest.mark.asyncio
+class TestFormatConversationForLLM:
+    @patch("echos_lab.twitter.twitter_browser.get_tweet_from_tweet_id", new_callable=AsyncMock)
+    async def test_format_conversation_from_payload(self, mock_get_tweet: AsyncMock):
+        """
+        Tests formatting a conversation where every tweet is in the payload, which should
+        resolve each author's username from the payload's users without scraping
+        """
+        conversation = await post_retriever.format_conversation_for_llm(build_notification_data(), "2", scraper=Mock())
+
+        assert "@userB [Replying to @userA tweet 1]" in conversation
+        assert "@userA [Original tweet]" in conversation
+        assert "Username not available" not in conversation
+        mock_get_tweet.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestFindAllConversations:
+    @patch("echos_lab.engines.post_retriever.format_conversation_for_llm", new_callable=AsyncMock)
+    @patch("echos_lab.engines.post_retriever.get_root_tweet_id", new_callable=AsyncMock)
+    async def test_find_all_conversations_order(self, mock_get_root: AsyncMock, mock_format: AsyncMock):
+        """
+        Tests that conversations whose root can't be found stay in newest first order
+        alongside the formatted conversations
+        """
+        data = {
+            "globalObjects": {
+                "tweets": {
+                    "1": {"created_at": "2024-01-01 00:01"},
+                    "2": {"created_at": "2024-01-01 00:02"},
+                    "3": {"created_at": "2024-01-01 00:03"},
+                    "4": {"created_at": "2024-01-01 00:04"},
+                }
+            }
+        }
+
+        # Tweet 2's root can't be found, and tweets 1 and 3 are in the same conversation
+        root_ids = {"1": "1", "2": None, "3": "1", "4": "4"}
+        mock_get_root.side_effect = lambda tweets, tweet_id, scraper, root_cache: root_ids[tweet_id]
+        mock_format.side_effect = lambda data, tweet_id, scraper: f"conversation {tweet_id}"
+
+        conversations = await post_retriever.find_all_conversations(data, scraper=Mock())
+
+        assert conversations == [
+            ("conversation 4", "4"),
+            ("conversation 3", "3"),
+            ("Unable to find root tweet for conversation.", "2"),
+        ]
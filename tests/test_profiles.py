@@ -1,6 +1,10 @@
+from dataclasses import FrozenInstanceError
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+import pytest
+
+from echos_lab.engines import profiles
 from echos_lab.engines.profiles import (
     AgentProfile,
     AgentTone,
@@ -12,7 +16,7 @@ TEST_PROFILES = "tests/fixtures/profiles"
 
 
 class TestAgentProfile:
-    def _create_profile(self, tone: AgentTone | None) -> AgentProfile:
+    def _create_profile(self, tone: AgentTone | None, followers: tuple[FollowedAccount, ...] = ()) -> AgentProfile:
         """Helper to create profiles with defaults"""
         return AgentProfile(
             name="name",
@@ -28,6 +32,7 @@ class TestAgentProfile:
             subtweet_analysis_prompt="",
             subtweet_creation_prompt="",
             tone=tone,
+            followers=followers,
         )
 
     def test_get_default_tone(self):
@@ -53,6 +58,52 @@ class TestAgentProfile:
         assert self._create_profile(AgentTone(default="chill")).get_aggressive_tone() == "chill"
         assert self._create_profile(AgentTone(default="chill", aggressive="grr")).get_aggressive_tone() == "chill grr"
 
+    def test_get_subtones_tone_updated(self):
+        """
+        Tests that the friendly and aggressive tones reflect a tone that's replaced or modified after construction
+        """
+        profile = self._create_profile(AgentTone(default="chill", friendly="nice", aggressive="grr"))
+        assert profile.get_friendly_tone() == "chill nice"
+        assert profile.get_aggressive_tone() == "chill grr"
+
+        new_tone = AgentTone(default="calm", friendly="kind")
+        profile.tone = new_tone
+        assert profile.get_friendly_tone() == "calm kind"
+        assert profile.get_aggressive_tone() == "calm"
+
+        new_tone.aggressive = "mad"
+        assert profile.get_aggressive_tone() == "calm mad"
+
+        profile.tone = None
+        assert profile.get_friendly_tone() is None
+        assert profile.get_aggressive_tone() is None
+
+    def test_get_reply_probability(self):
+        """
+        Tests getting the reply probability for followed and unfollowed accounts
+        """
+        assert self._create_profile(None).get_reply_probability("follower1") == 1.0
+
+        profile = self._create_profile(None, followers=(FollowedAccount(username="follower1", reply_probability=0.1),))
+        assert profile.get_reply_probability("follower1") == 0.1
+        assert profile.get_reply_probability("follower2") == 1.0
+
+    def test_get_reply_probability_followers_updated(self):
+        """
+        Tests that the reply probability reflects followers that are replaced after construction,
+        and that the followers can't be modified in place
+        """
+        profile = self._create_profile(None, followers=(FollowedAccount(username="follower1", reply_probability=0.1),))
+        assert profile.get_reply_probability("follower1") == 0.1
+
+        profile.followers = (FollowedAccount(username="follower1", reply_probability=0.5),)
+        assert profile.get_reply_probability("follower1") == 0.5
+
+        with pytest.raises(FrozenInstanceError):
+            profile.followers[0].reply_probability = 0.9  # type: ignore
+        with pytest.raises(AttributeError):
+            profile.followers.append(FollowedAccount(username="follower2"))  # type: ignore
+
     def test_get_tweet_analysis_output_example(self):
         """
         Tests getting the tweet analysis example
@@ -118,10 +169,10 @@ class TestReadAgentProfiles:
             tweet_reply_prompt="Tweet reply prompt",
             subtweet_analysis_prompt="Subtweet analysis prompt",
             subtweet_creation_prompt="Subtweet creation prompt",
-            followers=[
+            followers=(
                 FollowedAccount(username="follower1", reply_probability=0.1),
                 FollowedAccount(username="follower2", reply_probability=0.2),
-            ],
+            ),
         )
 
     @patch.object(AgentProfile, "_get_base_config_path", return_value=Path(f"{TEST_PROFILES}/profile.yaml"))
@@ -152,10 +203,10 @@ class TestReadAgentProfiles:
             tweet_reply_prompt="Tweet reply prompt",
             subtweet_analysis_prompt="Subtweet analysis prompt",
             subtweet_creation_prompt="Subtweet creation prompt",
-            followers=[
+            followers=(
                 FollowedAccount(username="follower1", reply_probability=0.1),
                 FollowedAccount(username="follower2", reply_probability=0.2),
-            ],
+            ),
         )
 
     @patch.object(AgentProfile, "_get_base_config_path", return_value=Path(f"{TEST_PROFILES}/profile.yaml"))
@@ -186,10 +237,10 @@ class TestReadAgentProfiles:
             tweet_reply_prompt="Overriding tweet reply prompt",
             subtweet_analysis_prompt="Overriding subtweet analysis prompt",
             subtweet_creation_prompt="Overriding subtweet creation prompt",
-            followers=[
+            followers=(
                 FollowedAccount(username="follower1", reply_probability=0.1),
                 FollowedAccount(username="follower2", reply_probability=0.2),
-            ],
+            ),
         )
 
     @patch.object(AgentProfile, "_get_base_config_path", return_value=Path("notspecified"))
@@ -216,7 +267,7 @@ class TestReadAgentProfiles:
             tweet_reply_prompt="Tweet reply prompt",
             subtweet_analysis_prompt="Subtweet analysis prompt",
             subtweet_creation_prompt="Subtweet creation prompt",
-            followers=[],
+            followers=(),
         )
 
     @patch.object(LegacyAgentProfile, "_get_profile_path", return_value=Path(f"{TEST_PROFILES}/legacy_profile.yaml"))
@@ -237,3 +288,21 @@ class TestReadAgentProfiles:
             tools_to_exclude=["tool1", "tool2"],
             extra_prompt="Extra Prompt",
         )
+
+    @patch.object(AgentProfile, "_get_base_config_path", return_value=Path("ignore"))
+    @patch.object(AgentProfile, "_get_profile_path", return_value=Path(f"{TEST_PROFILES}/profile.yaml"))
+    @patch.object(profiles, "_agent_profile", None)
+    def test_get_agent_profile_singleton(self, mock_profile_path: Mock, mock_base_path: Mock):
+        """
+        Tests that the configured agent profile is only loaded once, unless explicitly reloaded
+        """
+        profile = profiles.get_agent_profile()
+        assert profile.name == "test"
+        assert profiles.get_agent_profile() is profile
+        assert mock_profile_path.call_count == 1
+
+        reloaded_profile = profiles.reload_agent_profile()
+        assert reloaded_profile == profile
+        assert reloaded_profile is not profile
+        assert profiles.get_agent_profile() is reloaded_profile
+        assert mock_profile_path.call_count == 2
@@ -9,7 +9,6 @@ from langchain_core.exceptions import OutputParserException
 from echos_lab.common.utils import wrap_xml_tag
 from echos_lab.engines import prompts
 from echos_lab.engines.agent_context import AgentContext
-from echos_lab.engines.prompts import XMLAttributeParser
 from echos_lab.twitter.types import TweetMention
 
 
@@ -140,6 +139,21 @@ class TestBuildAuthorRecentTweetsPrompt:
         actual_prompt = prompts.build_author_recent_tweets_prompt(author, tweets)
         assert normalize_prompts(actual_prompt) == normalize_prompts(test_prompts.AUTHOR_RECENT_TWEETS)
 
+    def test_build_author_recent_tweets_over_budget(self):
+        """
+        Tests that the older tweets are dropped once the character budget is exceeded
+        """
+        tweets = [
+            build_tweet(id=1, text="a" * 10),
+            build_tweet(id=2, text="b" * 10),
+            build_tweet(id=3, text="c" * 10),
+        ]
+
+        actual_prompt = prompts.build_author_recent_tweets_prompt("userA", tweets, budget_chars=40)
+        assert "@userA's last 2 tweets:" in actual_prompt
+        assert f"tweet: {'a' * 10} ||| tweet: {'b' * 10}" in actual_prompt
+        assert "c" * 10 not in actual_prompt
+
     def test_build_author_recent_tweets_no_tweets(self):
         """
         Tests the author recent tweets prompt for when there are no tweets
@@ -169,52 +183,61 @@ class TestBuildAgentRecentTweetsPrompt:
 
 
 class TestXMLParser:
-    parser = XMLAttributeParser()
-
-    def _wrap_data_and_parse_xml(self, input_data: dict[str, list[dict[str, str]]]) -> str:
-        """Helper function to wrap the data into XML and then parse it"""
-        inner_xml = "".join(wrap_xml_tag(k, v) for d in input_data["output"] for k, v in d.items())
+    def _wrap_data_in_xml(self, input_data: dict[str, str]) -> str:
+        """Helper function to wrap the data into XML"""
+        inner_xml = "".join(wrap_xml_tag(k, v) for k, v in input_data.items())
         return wrap_xml_tag("output", inner_xml)
 
-    def _get_expected_output(self, input_data: dict[str, list[dict[str, str]]]) -> dict[str, list[dict[str, str]]]:
+    def _get_expected_output(self, input_data: dict[str, str]) -> dict[str, str]:
         """Builds the expected dict data, adding in whitespace on either end of the input"""
-        output_data = copy.deepcopy(input_data)
-        for attribute in output_data["output"]:
-            attribute_key, attribute_value = next(iter(attribute.items()))
-            attribute[attribute_key] = f"\n{attribute_value}\n"
-        return output_data
+        return {k: f"\n{v}\n" for k, v in input_data.items()}
 
     def test_xml_parser_no_special_characters(self):
         """
         Tests XML parsing with no special characters
         """
         data = {
-            "output": [
-                {"tweet_analysis": "you and me"},
-                {"response": "no special characters"},
-                {"test_value": "tester"},
-            ]
+            "tweet_analysis": "you and me",
+            "response": "no special characters",
+            "test_value": "tester",
         }
         expected_output = self._get_expected_output(data)
 
-        xml_content = self._wrap_data_and_parse_xml(data)
-        assert self.parser.parse(xml_content) == expected_output
+        xml_content = self._wrap_data_in_xml(data)
+        assert prompts.parse_xml_output(xml_content) == expected_output
 
     def test_xml_parser_escapes_characters(self):
         """
         Tests XML parsing with special characters
         """
         data = {
-            "output": [
-                {"tweet_analysis": "you & me"},
-                {"response": "spec1al 'chars'"},
-                {"test_value": "test!"},
-            ]
+            "tweet_analysis": "you & me",
+            "response": "spec1al 'chars' &amp; &lt;3",
+            "test_value": "test!",
         }
         expected_output = self._get_expected_output(data)
+        expected_output["response"] = "\nspec1al 'chars' & <3\n"
 
-        xml_content = self._wrap_data_and_parse_xml(data)
-        assert self.parser.parse(xml_content) == expected_output
+        xml_content = self._wrap_data_in_xml(data)
+        assert prompts.parse_xml_output(xml_content) == expected_output
+
+    def test_xml_parser_surrounding_whitespace(self):
+        """
+        Tests XML parsing with whitespace around the root tag and indented child tags,
+        which should keep the whitespace inside each tag
+        """
+        xml_content = (
+            "\n\n   <output>\n    <response>  indented response  </response>\n  <empty></empty>\n</output>  \n"
+        )
+        assert prompts.parse_xml_output(xml_content) == {"response": "  indented response  ", "empty": ""}
+
+    def test_escape_ampersands(self):
+        """
+        Tests that only ampersands outside of an existing XML entity are escaped
+        """
+        assert prompts.escape_ampersands("no ampersands") == "no ampersands"
+        assert prompts.escape_ampersands("you & me") == "you &amp; me"
+        assert prompts.escape_ampersands("&amp; &lt; &gt; &quot; &") == "&amp; &lt; &gt; &quot; &amp;"
 
     def test_xml_parser_missing_closing_tag(self):
         """
@@ -223,7 +246,7 @@ class TestXMLParser:
         xml_content = "<output><some_attribute></output>"
 
         with pytest.raises(OutputParserException):
-            self.parser.parse(xml_content)
+            prompts.parse_xml_output(xml_content)
 
     def test_xml_parser_missing_closing_bracket(self):
         """
@@ -232,4 +255,57 @@ class TestXMLParser:
         xml_content = "<output><some_attribute></some_attribute</output>"
 
         with pytest.raises(OutputParserException):
-            self.parser.parse(xml_content)
+            prompts.parse_xml_output(xml_content)
+
+
+class TestEvaluationFromXML:
+    def test_tweet_evaluation_from_xml(self):
+        """
+        Tests parsing a tweet evaluation from the raw XML response, including
+        an unescaped ampersand and indented response lines
+        """
+        xml_content = """
+        <output>
+            <tweet_analysis>you & me</tweet_analysis>
+            <engagement_strategy>strategy</engagement_strategy>
+            <response>
+                line one
+                line two
+            </response>
+            <response_rating> 7 </response_rating>
+            <meme_name>drake</meme_name>
+            <meme_id>181913649</meme_id>
+            <meme_caption>top, bottom</meme_caption>
+            <meme_rating>3</meme_rating>
+        </output>
+        """
+        evaluation = prompts.TweetEvaluation.from_xml(xml_content)
+
+        assert evaluation.tweet_analysis == "you & me"
+        assert evaluation.engagement_strategy == "strategy"
+        assert evaluation.response.strip() == "line one\nline two"
+        assert evaluation.response_rating == 7
+        assert evaluation.meme_name == "drake"
+        assert evaluation.meme_id == 181913649
+        assert evaluation.meme_caption == "top, bottom"
+        assert evaluation.meme_rating == 3
+
+    def test_subtweet_evaluation_from_xml_in_code_block(self):
+        """
+        Tests parsing a subtweet evaluation when the LLM wraps the XML in a markdown code block
+        """
+        xml_content = "```xml\n<output><topic_analysis>topic</topic_analysis><engagement_strategy>strategy</engagement_strategy><subtweet>subtweet</subtweet></output>\n```"  # noqa
+        evaluation = prompts.SubTweetEvaluation.from_xml(xml_content)
+
+        assert evaluation == prompts.SubTweetEvaluation(
+            subtweet="subtweet",
+            topic_analysis="topic",
+            engagement_strategy="strategy",
+        )
+
+    def test_evaluation_from_xml_invalid(self):
+        """
+        Tests that invalid XML raises an output parser exception
+        """
+        with pytest.raises(OutputParserException):
+            prompts.SubTweetEvaluation.from_xml("<output><subtweet></output>")
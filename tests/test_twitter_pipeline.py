@@ -1,4 +1,5 @@
 from collections import OrderedDict
+from contextlib import nullcontext
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -107,6 +108,47 @@ class TestGetUserIdsFromUsernames:
             await twitter_pipeline.get_user_ids_from_usernames(db, usernames)
 
 
+@pytest.mark.asyncio
+class TestRequireStoredUserIdFromUsername:
+    @patch("echos_lab.db.db_setup.get_db")
+    @patch("echos_lab.twitter.twitter_client.get_user_id_from_username")
+    async def test_require_stored_user_id_in_db(self, mock_get_user_id: AsyncMock, mock_get_db, db: Session):
+        """
+        Tests fetching a stored user ID from a username when the user is in the database
+        """
+        mock_get_db.side_effect = lambda: nullcontext(db)
+        db_connector.add_twitter_user(db, user_id=1, username="user")
+
+        assert await twitter_pipeline.require_stored_user_id_from_username("user") == 1
+        mock_get_user_id.assert_not_called()
+
+    @patch("echos_lab.db.db_setup.get_db")
+    @patch("echos_lab.twitter.twitter_client.get_user_id_from_username")
+    async def test_require_stored_user_id_not_in_db(self, mock_get_user_id: AsyncMock, mock_get_db, db: Session):
+        """
+        Tests fetching a stored user ID from a username when the user is NOT in the database,
+        which should look it up from the API and then store it
+        """
+        mock_get_db.side_effect = lambda: nullcontext(db)
+        mock_get_user_id.return_value = 1
+
+        assert await twitter_pipeline.require_stored_user_id_from_username("user") == 1
+        user = db_connector.get_twitter_user(db, username="user")
+        assert user is not None and user.user_id == 1
+
+    @patch("echos_lab.db.db_setup.get_db")
+    @patch("echos_lab.twitter.twitter_client.get_user_id_from_username")
+    async def test_require_stored_user_id_not_found(self, mock_get_user_id: AsyncMock, mock_get_db, db: Session):
+        """
+        Tests that a username that can't be found in the database or API raises an error
+        """
+        mock_get_db.side_effect = lambda: nullcontext(db)
+        mock_get_user_id.return_value = None
+
+        with pytest.raises(RuntimeError, match=r"Twitter User ID not found for handle @user"):
+            await twitter_pipeline.require_stored_user_id_from_username("user")
+
+
 @pytest.mark.asyncio
 class TestCheckpoint:
     async def test_create_get_checkpoint(self, db: Session):
@@ -455,10 +455,10 @@ class TestReplyToFollowers:
         # We'll set it so that we should not skip the tweet, nor send a quote tweet
         mock_random.return_value = 0.9
         agent_profile.quote_tweet_threshold = 0.2  # below this will quote tweet (should NOT quote tweet)
-        agent_profile.followers = [
+        agent_profile.followers = (
             FollowedAccount("userA", reply_probability=0.95),  # below this will reply (should reply)
             FollowedAccount("userB", reply_probability=0.95),  # below this will reply (should reply)
-        ]
+        )
 
         # Call reply
         tweets = [follower_tweet1, follower_tweet2]
@@ -517,10 +517,10 @@ class TestReplyToFollowers:
         # We'll set it so that we should not skip the tweet, but we should send a quote tweet
         mock_random.return_value = 0.1
         agent_profile.quote_tweet_threshold = 0.2  # below this will quote tweet (SHOULD quote tweet)
-        agent_profile.followers = [
+        agent_profile.followers = (
             FollowedAccount("userA", reply_probability=0.95),  # below this will reply (should reply)
             FollowedAccount("userB", reply_probability=0.95),  # below this will reply (should reply)
-        ]
+        )
 
         # Call reply
         await twitter_poster.reply_to_followers(agent_profile=agent_profile, tweets=[follower_tweet])
@@ -569,10 +569,10 @@ class TestReplyToFollowers:
         # and we should not quote tweet
         mock_random.return_value = 0.9
         agent_profile.quote_tweet_threshold = 0.2  # below this will quote tweet (should NOT quote tweet)
-        agent_profile.followers = [
+        agent_profile.followers = (
             FollowedAccount("userA", reply_probability=0.1),  # below this will reply (should NOT reply)
             FollowedAccount("userB", reply_probability=0.95),  # below this will reply (should reply)
-        ]
+        )
 
         # Call reply
         tweets = [follower_tweet1, follower_tweet2]